@@ -1,46 +1,1821 @@
 import tkinter as tk
 from tkinter import Canvas, Label, Button, messagebox
-import cv2
 import numpy as np
-import pyautogui
 import time
 import threading
-import keyboard
-from PIL import ImageGrab, Image, ImageTk
+import importlib
 import os
+import sys
+import subprocess
+import queue
+import random
+import abc
+import argparse
+import json
+import csv
+import math
+import struct
+import base64
+import logging
+import logging.handlers
+
+class LazyModule:
+    """Módulo importado só no primeiro acesso a um atributo (ou em load(), em segundo plano)."""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+    
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+    
+    def loaded(self):
+        return self._module is not None
+    
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+cv2 = LazyModule("cv2")
+Image = LazyModule("PIL.Image")
+ImageGrab = LazyModule("PIL.ImageGrab")
+ImageTk = LazyModule("PIL.ImageTk")
+pyautogui = LazyModule("pyautogui")
+
+# Módulos que a inicialização da interface não deve importar
+HEAVY_MODULES = ("cv2", "PIL.Image", "pyautogui", "keyboard")
+
+class PILGrabber:
+    """Captura com PIL ImageGrab: funciona em qualquer sistema, mas aloca uma imagem nova por captura."""
+    name = "pil"
+    
+    def __init__(self):
+        ImageGrab.load()
+        self.grabs = 0
+        self.bytes_copied = 0
+    
+    def grab(self, bbox=None):
+        image = ImageGrab.grab(bbox=bbox)
+        frame = np.asarray(image)
+        self.grabs += 1
+        self.bytes_copied += len(image.getbands()) * image.width * image.height + frame.nbytes
+        return frame
+    
+    def close(self):
+        pass
+
+class XShmGrabber:
+    """Captura via extensão MIT-SHM do X11, com um segmento compartilhado reaproveitado por tamanho de região."""
+    name = "xshm"
+    
+    def __init__(self, display_name=None):
+        import ctypes
+        import ctypes.util
+        
+        libraries = {name: ctypes.util.find_library(name) for name in ("X11", "Xext")}
+        if not all(libraries.values()):
+            raise OSError("bibliotecas X11/Xext não encontradas")
+        self.ctypes = ctypes
+        self.x11 = ctypes.CDLL(libraries["X11"])
+        self.xext = ctypes.CDLL(libraries["Xext"])
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        
+        class XImage(ctypes.Structure):
+            # Só os campos iniciais da struct do Xlib, que são os lidos aqui
+            _fields_ = [("width", ctypes.c_int), ("height", ctypes.c_int), ("xoffset", ctypes.c_int),
+                        ("format", ctypes.c_int), ("data", ctypes.c_void_p), ("byte_order", ctypes.c_int),
+                        ("bitmap_unit", ctypes.c_int), ("bitmap_bit_order", ctypes.c_int), ("bitmap_pad", ctypes.c_int),
+                        ("depth", ctypes.c_int), ("bytes_per_line", ctypes.c_int), ("bits_per_pixel", ctypes.c_int)]
+        
+        class XShmSegmentInfo(ctypes.Structure):
+            _fields_ = [("shmseg", ctypes.c_ulong), ("shmid", ctypes.c_int), ("shmaddr", ctypes.c_void_p), ("readOnly", ctypes.c_int)]
+        
+        class Visual(ctypes.Structure):
+            # Campos iniciais do Visual do Xlib, até as máscaras de cor
+            _fields_ = [("ext_data", ctypes.c_void_p), ("visualid", ctypes.c_ulong), ("c_class", ctypes.c_int),
+                        ("red_mask", ctypes.c_ulong), ("green_mask", ctypes.c_ulong), ("blue_mask", ctypes.c_ulong)]
+        
+        ErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+        
+        self.segment_info = XShmSegmentInfo
+        self.x11.XOpenDisplay.restype = ctypes.c_void_p
+        self.x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self.x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        for function in ("XRootWindow", "XDefaultVisual", "XDefaultDepth", "XDisplayWidth", "XDisplayHeight"):
+            getattr(self.x11, function).argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.x11.XRootWindow.restype = ctypes.c_ulong
+        self.x11.XDefaultVisual.restype = ctypes.c_void_p
+        self.x11.XImageByteOrder.argtypes = [ctypes.c_void_p]
+        self.x11.XSetErrorHandler.restype = ctypes.c_void_p
+        self.x11.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+        self.x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self.xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        self.xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        self.xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                              ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint]
+        self.xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        self.xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        self.xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        self.libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        self.libc.shmat.restype = ctypes.c_void_p
+        self.libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        self.libc.shmdt.argtypes = [ctypes.c_void_p]
+        self.libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+        
+        self.display = self.x11.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self.display:
+            raise OSError("não foi possível abrir o display X11")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.x11.XCloseDisplay(self.display)
+            raise OSError("o servidor X não tem a extensão MIT-SHM")
+        
+        screen = self.x11.XDefaultScreen(self.display)
+        self.root = self.x11.XRootWindow(self.display, screen)
+        self.visual = self.x11.XDefaultVisual(self.display, screen)
+        self.depth = self.x11.XDefaultDepth(self.display, screen)
+        
+        # A conversão em grab supõe pixels BGRX (vermelho no byte 2, azul no byte 0)
+        visual = Visual.from_address(self.visual)
+        if (visual.red_mask, visual.blue_mask) != (0xFF0000, 0xFF) or self.x11.XImageByteOrder(self.display) != 0:  # 0 = LSBFirst
+            self.x11.XCloseDisplay(self.display)
+            raise OSError("formato de pixel da tela não suportado pelo XShmGrabber")
+        
+        # Erros do X nas chamadas do XShm (região fora da tela, por exemplo) não devem encerrar o
+        # processo; o tratador só fica instalado durante essas chamadas (ver trapped), e erros de
+        # outras conexões (a do Tk) seguem para o tratador anterior
+        self.previous_handler = None
+        self.errors = 0
+        self.error_handler = ErrorHandler(self.handle_error)
+        self.error_handler_type = ErrorHandler
+        self.screen_size = (self.x11.XDisplayWidth(self.display, screen), self.x11.XDisplayHeight(self.display, screen))
+        
+        self.lock = threading.Lock()  # o Xlib não deve ser usado por duas threads ao mesmo tempo
+        self.segments = {}  # (largura, altura) -> (imagem, info do segmento, view NumPy)
+        self.grabs = 0
+        self.bytes_copied = 0
+    
+    def segment(self, width, height):
+        """Segmento compartilhado para capturas deste tamanho, criado na primeira vez."""
+        if (width, height) in self.segments:
+            return self.segments[(width, height)]
+        
+        ctypes = self.ctypes
+        info = self.segment_info()
+        image = self.xext.XShmCreateImage(self.display, self.visual, self.depth, 2, None, ctypes.byref(info), width, height)  # 2 = ZPixmap
+        if not image or image.contents.bits_per_pixel != 32:
+            raise OSError("formato de pixel da tela não suportado pelo XShmGrabber")
+        size = image.contents.bytes_per_line * height
+        info.shmid = self.libc.shmget(0, size, 0o1000 | 0o600)  # IPC_PRIVATE, IPC_CREAT
+        if info.shmid < 0:
+            raise OSError(ctypes.get_errno(), "shmget falhou")
+        info.shmaddr = self.libc.shmat(info.shmid, None, 0)
+        info.readOnly = 0
+        image.contents.data = info.shmaddr
+        attached = self.trapped(self.xext.XShmAttach, self.display, ctypes.byref(info), sync=True)
+        self.libc.shmctl(info.shmid, 0, None)  # IPC_RMID: o segmento some quando for desanexado
+        if not attached:
+            self.libc.shmdt(info.shmaddr)
+            raise OSError("XShmAttach falhou")
+        
+        buffer = (ctypes.c_ubyte * size).from_address(info.shmaddr)
+        view = np.frombuffer(buffer, dtype=np.uint8).reshape(height, image.contents.bytes_per_line // 4, 4)[:, :width]
+        self.segments[(width, height)] = (image, info, view)
+        return self.segments[(width, height)]
+    
+    def grab(self, bbox=None):
+        if bbox is None:
+            bbox = (0, 0) + self.screen_size
+        x1, y1, x2, y2 = bbox
+        with self.lock:
+            image, _, view = self.segment(x2 - x1, y2 - y1)
+            if not self.trapped(self.xext.XShmGetImage, self.display, self.root, image, x1, y1, 0xFFFFFFFF):
+                raise OSError(f"XShmGetImage falhou para a região {bbox}")
+            frame = view[:, :, 2::-1].copy()  # BGRX -> RGB
+        self.grabs += 1
+        self.bytes_copied += frame.nbytes
+        return frame
+    
+    def handle_error(self, display, event):
+        if display != self.display and self.previous_handler:
+            return self.error_handler_type(self.previous_handler)(display, event)
+        self.errors += 1
+        return 0
+    
+    def trapped(self, function, *args, sync=False):
+        """Chama uma função do XShm com o tratador de erros próprio e restaura o anterior; retorna 0 se houve erro."""
+        self.previous_handler = self.x11.XSetErrorHandler(self.ctypes.cast(self.error_handler, self.ctypes.c_void_p))
+        self.errors = 0
+        try:
+            result = function(*args)
+            if sync:
+                # Chamada sem resposta: esperar os erros enquanto o tratador está instalado
+                self.x11.XSync(self.display, 0)
+        finally:
+            self.x11.XSetErrorHandler(self.previous_handler)
+        return 0 if self.errors else result
+    
+    def close(self):
+        with self.lock:
+            for image, info, _ in self.segments.values():
+                self.xext.XShmDetach(self.display, self.ctypes.byref(info))
+                self.libc.shmdt(info.shmaddr)
+            self.segments.clear()
+            if self.display:
+                self.x11.XCloseDisplay(self.display)
+                self.display = None
+
+class ArrayGrabber:
+    """Tela falsa: recorta regiões de um array RGB (ou de uma imagem em arquivo), sem display."""
+    name = "array"
+    
+    def __init__(self, screen):
+        self.screen = np.ascontiguousarray(np.asarray(screen)[..., :3])
+        self.grabs = 0
+        self.bytes_copied = 0
+    
+    @classmethod
+    def from_file(cls, path):
+        return cls(np.asarray(Image.open(path).convert("RGB")))
+    
+    def grab(self, bbox=None):
+        if bbox is None:
+            frame = self.screen.copy()
+        else:
+            x1, y1, x2, y2 = bbox
+            frame = self.screen[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)].copy()
+        self.grabs += 1
+        self.bytes_copied += frame.nbytes
+        return frame
+    
+    def close(self):
+        pass
+
+CAPTURE_BACKENDS = {"xshm": XShmGrabber, "pil": PILGrabber}
+
+def open_grabber(capture="auto"):
+    """Cria o grabber pelo nome; "auto" tenta o XShm e cai no PIL se ele não estiver disponível."""
+    if not isinstance(capture, str):
+        return capture
+    if capture != "auto":
+        return CAPTURE_BACKENDS[capture]()
+    try:
+        return XShmGrabber()
+    except OSError:
+        return PILGrabber()
+
+class DesktopBackend:
+    """Tela e mouse reais: captura com um grabber plugável e cliques com pyautogui, criados no primeiro uso."""
+    def __init__(self, capture="auto"):
+        self.capture = capture
+        self.grabber = None
+        self.lock = threading.Lock()
+    
+    def load(self):
+        pyautogui.load()
+        self.screen_grabber()
+    
+    def screen_grabber(self):
+        if self.grabber is None:
+            with self.lock:
+                if self.grabber is None:
+                    self.grabber = open_grabber(self.capture)
+        return self.grabber
+    
+    def grab(self, bbox=None):
+        return self.screen_grabber().grab(bbox)
+    
+    def click(self, x, y):
+        pyautogui.click(x, y, _pause=False)
+    
+    def move(self, x, y):
+        pyautogui.moveTo(x, y, _pause=False)
+
+class SimulatedBoard:
+    """Jogo da memória simulado em arrays NumPy, com a mesma interface do DesktopBackend; o tempo é contado em capturas."""
+    def __init__(self, rows=4, cols=4, card_size=64, origin=(200, 200), seed=None, hide_after=5, noise=0, restart_after=None,
+                 input_lock=False, face_seed=None, card_height=None):
+        self.rows = rows
+        self.cols = cols
+        self.card_width = card_size
+        self.card_height = card_height or card_size
+        self.origin = origin
+        self.hide_after = hide_after  # capturas em que um par virado fica visível
+        self.noise = noise
+        self.restart_after = restart_after  # capturas após o fim até distribuir um novo jogo (None não reinicia)
+        self.input_lock = input_lock  # ignorar cliques enquanto um par é mostrado, como a maioria dos jogos
+        self.face_seed = face_seed  # mesmo baralho em todos os jogos
+        self.rng = np.random.default_rng(seed)
+        
+        self.back_image = np.full((self.card_height, self.card_width, 3), 90, dtype=np.uint8)
+        self.back_image[4:-4, 4:-4] = (40, 70, 160)
+        
+        self.clicks = 0
+        self.dropped_clicks = 0
+        self.moves = 0
+        self.grabs = 0
+        self.games = 0
+        self.idle_ticks = 0
+        
+        self.frame = np.zeros((rows * self.card_height, cols * self.card_width, 3), dtype=np.uint8)
+        
+        # Área de referência logo abaixo do tabuleiro, com uma face de cada tipo
+        self.reward_cols = cols
+        self.reward_rows = max(1, -(-(rows * cols // 2) // cols))
+        self.reward_frame = np.zeros((self.reward_rows * self.card_height, cols * self.card_width, 3), dtype=np.uint8)
+        self.deal()
+    
+    def deal(self):
+        """Distribui um novo jogo: faces novas e embaralhadas, todas viradas para baixo."""
+        card_count = self.rows * self.cols
+        self.faces = np.repeat(np.arange(card_count // 2), 2)
+        self.rng.shuffle(self.faces)
+        if card_count % 2:
+            self.faces = np.append(self.faces, -1)
+        
+        face_rng = self.rng if self.face_seed is None else np.random.default_rng(self.face_seed)
+        self.face_images = [self.render_face(face_rng) for _ in range(card_count // 2)]
+        
+        self.face_up = np.zeros(card_count, dtype=bool)
+        self.matched = np.zeros(card_count, dtype=bool)
+        self.pending = []  # cartas viradas aguardando desvirar ou sumir
+        self.pending_ticks = 0
+        self.idle_ticks = 0
+        self.games += 1
+        
+        for position in range(card_count):
+            self.draw(position)
+        
+        width, height = self.card_width, self.card_height
+        for index, image in enumerate(self.face_images):
+            row, col = divmod(index, self.cols)
+            self.reward_frame[row * height:(row + 1) * height, col * width:(col + 1) * width] = image
+    
+    @property
+    def board_area(self):
+        x, y = self.origin
+        return (x, y, x + self.cols * self.card_width, y + self.rows * self.card_height)
+    
+    @property
+    def reward_area(self):
+        x, y = self.origin
+        top = y + self.rows * self.card_height + 20
+        return (x, top, x + self.reward_cols * self.card_width, top + self.reward_rows * self.card_height)
+    
+    def finished(self):
+        matched = self.matched.sum()
+        if len(self.pending) == 2 and self.faces[self.pending[0]] == self.faces[self.pending[1]]:
+            # O último par já foi encontrado, só falta a animação terminar
+            matched += 2
+        return matched >= len(self.faces) - len(self.faces) % 2
+    
+    def render_face(self, rng):
+        """Gera uma face aleatória em blocos coloridos, com a mesma moldura de uma carta real."""
+        blocks = rng.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+        face = cv2.resize(blocks, (self.card_width - 8, self.card_height - 8), interpolation=cv2.INTER_NEAREST)
+        image = np.full((self.card_height, self.card_width, 3), 230, dtype=np.uint8)
+        image[4:-4, 4:-4] = face
+        return image
+    
+    def cell(self, position):
+        """View da carta no frame do tabuleiro."""
+        row, col = divmod(position, self.cols)
+        width, height = self.card_width, self.card_height
+        return self.frame[row * height:(row + 1) * height, col * width:(col + 1) * width]
+    
+    def draw(self, position):
+        cell = self.cell(position)
+        if self.matched[position]:
+            cell[:] = 0
+        elif self.face_up[position]:
+            cell[:] = self.face_images[self.faces[position]]
+        else:
+            cell[:] = self.back_image
+    
+    def resolve_pending(self):
+        """Desvira (ou remove) o par aguardando, como o jogo faz ao fim da animação."""
+        if len(self.pending) == 2:
+            pos1, pos2 = self.pending
+            if self.faces[pos1] == self.faces[pos2]:
+                self.matched[[pos1, pos2]] = True
+            self.face_up[[pos1, pos2]] = False
+            self.draw(pos1)
+            self.draw(pos2)
+        self.pending = []
+    
+    def grab(self, bbox):
+        self.grabs += 1
+        if len(self.pending) == 2:
+            self.pending_ticks += 1
+            if self.pending_ticks > self.hide_after:
+                self.resolve_pending()
+        elif self.restart_after is not None and self.finished():
+            self.idle_ticks += 1
+            if self.idle_ticks > self.restart_after:
+                self.deal()
+        
+        x1, y1, x2, y2 = bbox
+        if y1 >= self.reward_area[1]:
+            ox, oy = self.reward_area[0], self.reward_area[1]
+            source = self.reward_frame
+        else:
+            ox, oy = self.origin
+            source = self.frame
+        frame = source[max(y1 - oy, 0):max(y2 - oy, 0), max(x1 - ox, 0):max(x2 - ox, 0)].copy()
+        if self.noise:
+            noise = self.rng.integers(-self.noise, self.noise + 1, frame.shape, dtype=np.int16)
+            frame = (frame + noise).clip(0, 255).astype(np.uint8)
+        return frame
+    
+    def click(self, x, y):
+        self.clicks += 1
+        ox, oy = self.origin
+        col = (x - ox) // self.card_width
+        row = (y - oy) // self.card_height
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return
+        
+        position = row * self.cols + col
+        if len(self.pending) == 2:
+            if self.input_lock:
+                # O jogo ignora cliques enquanto o par ainda está sendo mostrado
+                self.dropped_clicks += 1
+                return
+            # Um novo clique encerra a animação do par anterior
+            self.resolve_pending()
+        if self.matched[position] or self.face_up[position]:
+            return
+        
+        self.face_up[position] = True
+        self.pending.append(position)
+        self.draw(position)
+        if len(self.pending) == 2:
+            self.moves += 1
+            self.pending_ticks = 0
+    
+    def move(self, x, y):
+        pass
+
+class SimulatedDesktop:
+    """Vários SimulatedBoard lado a lado em uma única "tela", para testar o modo multi-tabuleiro."""
+    def __init__(self, boards):
+        self.boards = boards
+        areas = [board.board_area for board in boards]
+        self.size = (max(area[2] for area in areas), max(area[3] for area in areas))
+    
+    def grab(self, bbox):
+        screen = np.zeros((self.size[1], self.size[0], 3), dtype=np.uint8)
+        for board in self.boards:
+            x1, y1, x2, y2 = board.board_area
+            screen[y1:y2, x1:x2] = board.grab(board.board_area)
+        x1, y1, x2, y2 = bbox
+        return screen[y1:y2, x1:x2]
+    
+    def click(self, x, y):
+        for board in self.boards:
+            x1, y1, x2, y2 = board.board_area
+            if x1 <= x < x2 and y1 <= y < y2:
+                board.click(x, y)
+    
+    def move(self, x, y):
+        pass
+
+class ReplayBoard(SimulatedBoard):
+    """Tabuleiro simulado montado a partir de uma gravação, com as capturas e os pares confirmados da partida."""
+    def __init__(self, recording, hide_after=5):
+        header = recording["header"]
+        rows, cols = header["rows"], header["cols"]
+        # Gravações antigas não têm card_width/card_height: usar o tamanho da primeira carta da grade
+        width = header.get("card_width", header["grid_positions"][0][4])
+        height = header.get("card_height", header["grid_positions"][0][5])
+        super().__init__(rows, cols, card_size=width, card_height=height, origin=tuple(header["card_area"][:2]), seed=0,
+                         hide_after=hide_after)
+        
+        card_count = rows * cols
+        # Numa grade ímpar a carta que sobra pode nunca ter sido virada
+        missing = [position for position in range(card_count) if position not in recording["captures"]]
+        if len(missing) > card_count % 2:
+            raise ValueError(f"gravação sem captura das cartas {missing}")
+        
+        # Pares confirmados pelo jogo: cada par vira uma face
+        self.faces = np.full(card_count, -1)
+        for face, (pos1, pos2) in enumerate(recording["pairs"]):
+            self.faces[[pos1, pos2]] = face
+        unresolved = [position for position in range(card_count) if self.faces[position] < 0]
+        if len(unresolved) > card_count % 2:
+            raise ValueError(f"gravação sem o par das cartas {unresolved}")
+        
+        self.position_images = [self.fit(recording["captures"][position]) if position in recording["captures"] else self.back_image
+                                 for position in range(card_count)]
+        self.back_images = None
+        if recording["frame"] is not None:
+            frame = recording["frame"]
+            x0, y0 = header["card_area"][:2]
+            self.back_images = [self.fit(frame[y - y0:y - y0 + height, x - x0:x - x0 + width])
+                                for _, _, x, y, width, height in header["grid_positions"]]
+        for position in range(card_count):
+            self.draw(position)
+    
+    def fit(self, image):
+        if image.shape[:2] != (self.card_height, self.card_width):
+            image = cv2.resize(image, (self.card_width, self.card_height), interpolation=cv2.INTER_AREA)
+        return image
+    
+    def draw(self, position):
+        if not hasattr(self, "position_images"):
+            # Ainda no construtor da classe base
+            return super().draw(position)
+        cell = self.cell(position)
+        if self.matched[position]:
+            cell[:] = 0
+        elif self.face_up[position]:
+            cell[:] = self.position_images[position]
+        elif self.back_images is not None:
+            cell[:] = self.back_images[position]
+        else:
+            cell[:] = self.back_image
+
+class SharedScreenCapture:
+    """Produtor de capturas compartilhado: captura todos os tabuleiros de uma vez e entrega a cada um a sua região."""
+    def __init__(self, backend, regions, max_age=0.03):
+        self.backend = backend
+        self.bbox = (
+            min(region[0] for region in regions),
+            min(region[1] for region in regions),
+            max(region[2] for region in regions),
+            max(region[3] for region in regions),
+        )
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = 0.0
+        self.grab_count = 0
+    
+    def grab_for(self, client, bbox):
+        with self.lock:
+            now = time.monotonic()
+            if self.frame is None or client.last_frame_id == self.frame_id or now - self.frame_time > self.max_age:
+                self.frame = self.backend.grab(self.bbox)
+                self.frame_id += 1
+                self.frame_time = now
+                self.grab_count += 1
+            client.last_frame_id = self.frame_id
+            frame = self.frame
+        
+        # Região do tabuleiro relativa ao retângulo capturado
+        x1, y1, x2, y2 = bbox
+        return frame[y1 - self.bbox[1]:y2 - self.bbox[1], x1 - self.bbox[0]:x2 - self.bbox[0]]
+
+class InputScheduler:
+    """Serializa os cliques de todos os tabuleiros para que não disputem o mouse."""
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+    
+    def click(self, x, y):
+        with self.lock:
+            self.backend.click(x, y)
+    
+    def move(self, x, y):
+        with self.lock:
+            self.backend.move(x, y)
+
+class BoardBackend:
+    """Backend de um tabuleiro no modo multi-tabuleiro: capturas compartilhadas e cliques serializados."""
+    def __init__(self, shared_capture, input_scheduler):
+        self.shared_capture = shared_capture
+        self.input_scheduler = input_scheduler
+        self.last_frame_id = -1
+    
+    def grab(self, bbox):
+        return self.shared_capture.grab_for(self, bbox)
+    
+    def click(self, x, y):
+        self.input_scheduler.click(x, y)
+    
+    def move(self, x, y):
+        self.input_scheduler.move(x, y)
+
+class ClickDispatcher:
+    """Envia os cliques ao backend com o mínimo de chamadas de entrada."""
+    def __init__(self, backend, park_position=(100, 100), pause=0.0, park_enabled=True):
+        self.backend = backend
+        self.park_position = park_position
+        self.pause = pause
+        self.park_enabled = park_enabled
+        self.cursor_on_board = False
+        self.clicks = 0
+        self.parks = 0
+    
+    def click(self, x, y):
+        self.backend.click(x, y)
+        self.clicks += 1
+        self.cursor_on_board = True
+        if self.pause:
+            time.sleep(self.pause)
+    
+    def needs_park(self):
+        return self.park_enabled and self.cursor_on_board
+    
+    def park(self):
+        if not self.needs_park():
+            return
+        self.backend.move(*self.park_position)
+        self.parks += 1
+        self.cursor_on_board = False
+
+class BoardCapture:
+    """Captura a área de cartas em um único frame e devolve cada carta como view (sem cópia)."""
+    def __init__(self, card_area, grid_positions, backend, poll_interval=0.05):
+        self.card_area = card_area
+        self.grid_positions = grid_positions
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.frame = None
+        self.grab_count = 0
+        self.grab_time = 0.0
+        
+        # Assinaturas de cada carta no tabuleiro "em repouso" e as da última verificação
+        self.clean_cells = None
+        self.last_cells = None
+        
+        # Fração dos pixels amostrados que precisa mudar para contar como mudança
+        self.cell_fraction = 0.2
+        self.board_fraction = 0.01
+        
+        # Diferença mínima de um pixel (soma dos canais) para contar como mudança; measure_noise
+        # a eleva acima do ruído medido entre capturas do tabuleiro parado
+        self.base_pixel_tolerance = 48
+        self.pixel_tolerance = self.base_pixel_tolerance
+        self.noise_factor = 3
+        
+        # Cartas observadas na última espera que chegaram a mudar (mesmo que tenham voltado)
+        self.changed_positions = []
+    
+    def grab(self):
+        """Captura a área de cartas inteira de uma só vez e guarda o frame como array NumPy."""
+        start = time.perf_counter()
+        self.frame = self.backend.grab(self.card_area)
+        self.grab_time += time.perf_counter() - start
+        self.grab_count += 1
+        return self.frame
+    
+    def card_view(self, position, frame=None):
+        """Retorna a fatia do frame correspondente à carta, sem copiar os pixels."""
+        if frame is None:
+            frame = self.frame if self.frame is not None else self.grab()
+        
+        area_x, area_y = self.card_area[0], self.card_area[1]
+        _, _, x, y, width, height = self.grid_positions[position]
+        
+        # Coordenadas relativas ao frame capturado
+        x -= area_x
+        y -= area_y
+        return frame[y:y + height, x:x + width]
+    
+    def signature(self, frame=None, step=8):
+        """Assinatura barata do frame: uma amostragem reduzida dos pixels."""
+        if frame is None:
+            frame = self.grab()
+        return frame[::step, ::step].astype(np.int16)
+    
+    @staticmethod
+    def changed_pixels(signature1, signature2, pixel_tolerance=48):
+        """Conta os pixels da assinatura que mudaram mais que a tolerância (soma dos canais)."""
+        diff = np.abs(signature1 - signature2)
+        if diff.ndim == 3:
+            diff = diff.sum(axis=2)
+        return int((diff > pixel_tolerance).sum())
+    
+    def region_changed(self, current, reference, fraction=None, pixel_tolerance=None):
+        """True se mais que fraction dos pixels da assinatura mudaram mais que a tolerância (cell_fraction e pixel_tolerance por padrão)."""
+        if fraction is None:
+            fraction = self.cell_fraction
+        if pixel_tolerance is None:
+            pixel_tolerance = self.pixel_tolerance
+        limit = max(2, fraction * current.shape[0] * current.shape[1])
+        return self.changed_pixels(current, reference, pixel_tolerance) > limit
+    
+    def measure_noise(self, samples=3):
+        """Mede o ruído entre capturas seguidas e ajusta pixel_tolerance; retorna a diferença mediana."""
+        signatures = [self.signature() for _ in range(samples)]
+        # A mediana por par e o menor par ignoram uma animação que ainda esteja terminando
+        noise = min(float(np.median(np.abs(first - second).sum(axis=2)))
+                    for first, second in zip(signatures, signatures[1:]))
+        self.pixel_tolerance = max(self.base_pixel_tolerance, self.noise_factor * noise)
+        return noise
+    
+    def cell_signature(self, position, frame=None, step=8):
+        """Assinatura reduzida de uma única carta."""
+        if frame is None:
+            frame = self.grab()
+        return self.card_view(position, frame)[::step, ::step].astype(np.int16)
+    
+    def cell_signatures(self, frame=None, step=8):
+        """Assinatura reduzida de cada carta, todas tiradas do mesmo frame."""
+        if frame is None:
+            frame = self.grab()
+        return [self.cell_signature(position, frame, step) for position in range(len(self.grid_positions))]
+    
+    def reset_cells(self, frame=None):
+        """Usa o frame atual como o estado de repouso de todas as cartas."""
+        self.clean_cells = self.cell_signatures(frame)
+        self.last_cells = self.clean_cells
+    
+    def dirty_cells(self, frame=None, pixel_tolerance=None):
+        """Retorna as posições cujas cartas mudaram em relação ao estado de repouso (assinaturas guardadas em last_cells)."""
+        self.last_cells = self.cell_signatures(frame)
+        if self.clean_cells is None:
+            self.clean_cells = self.last_cells
+            return []
+        return [position for position, (current, clean) in enumerate(zip(self.last_cells, self.clean_cells))
+                if self.region_changed(current, clean, pixel_tolerance=pixel_tolerance)]
+    
+    def accept_cells(self, positions):
+        """Incorpora ao estado de repouso a aparência atual das posições informadas."""
+        for position in positions:
+            self.clean_cells[position] = self.last_cells[position]
+    
+    def wait_until_stable(self, timeout, reference=None, stable_polls=2, positions=None):
+        """Aguarda a área (ou as cartas em positions) mudar em relação a reference e parar de mudar; timeout é só o limite."""
+        deadline = time.monotonic() + timeout
+        fraction = self.board_fraction if positions is None else self.cell_fraction
+        if reference is not None and positions is None:
+            reference = [reference]
+        watched = [None] if positions is None else list(positions)
+        seen = [reference is None] * len(watched)  # cada área já mudou em relação a reference
+        changed_frame = None  # último frame com todas as áreas diferentes de reference
+        differs = seen
+        previous = None
+        stable = 0
+        
+        while True:
+            frame = self.grab()
+            if positions is None:
+                current = [self.signature(frame)]
+            else:
+                current = [self.cell_signature(position, frame) for position in positions]
+            
+            if reference is not None:
+                differs = [self.region_changed(cell, old, fraction) for cell, old in zip(current, reference)]
+                seen = [before or now for before, now in zip(seen, differs)]
+                if all(differs):
+                    changed_frame = frame
+            if all(seen) and previous is not None and not any(
+                    self.region_changed(cell, old, fraction) for cell, old in zip(current, previous)):
+                stable += 1
+                if stable >= stable_polls:
+                    break
+            else:
+                stable = 0
+            previous = current
+            
+            if time.monotonic() >= deadline:
+                break
+            if self.poll_interval:
+                time.sleep(self.poll_interval)
+        
+        self.changed_positions = [position for position, flag in zip(watched, seen) if flag and position is not None]
+        if not all(differs) and changed_frame is not None:
+            # Uma carta mudou e já voltou (o jogo desvirou o par): o frame útil é o da mudança
+            return changed_frame
+        return frame
+
+class CardFeatureStore:
+    """Guarda as características normalizadas de cada carta (cinza, 100x100, média zero) em uma matriz contígua."""
+    def __init__(self, capacity=16, size=(100, 100), bucket_min_cards=16, hash_bands=4,
+                 border=0.0, center_ignore=0.0, coarse_size=(16, 16), coarse_threshold=0.75):
+        self.capacity = capacity
+        self.positions = []
+        self.rows = {}  # posição -> linha da matriz
+        self.hashes = {}  # posição -> hash perceptual
+        self.buckets = {}  # (faixa, valor) -> linhas da matriz
+        self.bucket_min_cards = bucket_min_cards
+        self.hash_bands = hash_bands
+        self.coarse_threshold = coarse_threshold
+        self.size = size
+        self.border = border
+        self.center_ignore = center_ignore
+        self.coarse_size = coarse_size
+        self.configure()
+    
+    def configure(self, size=None, border=None, center_ignore=None, coarse_size=None):
+        """Altera a região de interesse e as resoluções; as cartas já guardadas são descartadas."""
+        if size is not None:
+            self.size = size
+        if border is not None:
+            self.border = border
+        if center_ignore is not None:
+            self.center_ignore = center_ignore
+        if coarse_size is not None:
+            self.coarse_size = coarse_size
+        
+        # Máscara dos pixels usados (False na área central ignorada)
+        self.mask = None
+        if self.center_ignore > 0:
+            width, height = self.size
+            mask = np.ones((height, width), dtype=bool)
+            ignore_w = int(round(width * self.center_ignore))
+            ignore_h = int(round(height * self.center_ignore))
+            x0 = (width - ignore_w) // 2
+            y0 = (height - ignore_h) // 2
+            mask[y0:y0 + ignore_h, x0:x0 + ignore_w] = False
+            self.mask = mask.ravel()
+        
+        self.features = np.zeros((self.capacity, self.size[0] * self.size[1]), dtype=np.float32)
+        self.coarse = None
+        if self.coarse_size:
+            self.coarse = np.zeros((self.capacity, self.coarse_size[0] * self.coarse_size[1]), dtype=np.float32)
+        self.clear()
+    
+    @property
+    def dimension(self):
+        return self.features.shape[1]
+    
+    def use_buckets(self, card_count):
+        return card_count > self.bucket_min_cards
+    
+    def perceptual_hash(self, feature):
+        """Hash médio 8x8 calculado a partir do vetor de características já normalizado."""
+        small = cv2.resize(feature.reshape(self.size[1], self.size[0]), (8, 8), interpolation=cv2.INTER_AREA)
+        bits = (small.ravel() > 0).astype(np.uint64)
+        return int((bits << np.arange(64, dtype=np.uint64)).sum())
+    
+    def bands(self, hash_value):
+        band_bits = 64 // self.hash_bands
+        mask = (1 << band_bits) - 1
+        return [(band, (hash_value >> (band * band_bits)) & mask) for band in range(self.hash_bands)]
+    
+    def candidates(self, position):
+        """Linhas das cartas que compartilham ao menos uma faixa do hash com a carta informada."""
+        rows = set()
+        for key in self.bands(self.hashes[position]):
+            rows.update(self.buckets.get(key, ()))
+        return sorted(rows)
+    
+    def extract(self, image):
+        """Converte uma imagem de carta no vetor de características normalizado."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.border:
+            # Descartar a borda (moldura e fundo) de cada lado
+            height, width = gray.shape
+            dy, dx = int(height * self.border), int(width * self.border)
+            gray = gray[dy:height - dy, dx:width - dx]
+        gray = cv2.resize(gray, self.size).astype(np.float32).ravel()
+        
+        if self.mask is None:
+            gray -= gray.mean()
+        else:
+            # A área central ignorada não entra na média nem na norma
+            gray -= gray[self.mask].mean()
+            gray[~self.mask] = 0
+        norm = np.linalg.norm(gray)
+        if norm > 0:
+            gray /= norm
+        return gray
+    
+    def extract_coarse(self, feature):
+        """Miniatura normalizada calculada a partir do vetor completo (já com média zero)."""
+        small = cv2.resize(feature.reshape(self.size[1], self.size[0]), self.coarse_size, interpolation=cv2.INTER_AREA).ravel()
+        norm = np.linalg.norm(small)
+        if norm > 0:
+            small /= norm
+        return small
+    
+    def add(self, position, image):
+        """Extrai e armazena as características da carta, substituindo as anteriores."""
+        feature = self.extract(image)
+        row = self.rows.get(position)
+        if row is None:
+            row = len(self.positions)
+            if row >= len(self.features):
+                # Dobrar a capacidade da matriz quando necessário
+                grown = np.zeros((len(self.features) * 2, self.features.shape[1]), dtype=np.float32)
+                grown[:row] = self.features[:row]
+                self.features = grown
+                if self.coarse is not None:
+                    grown = np.zeros((len(self.features), self.coarse.shape[1]), dtype=np.float32)
+                    grown[:row] = self.coarse[:row]
+                    self.coarse = grown
+            self.rows[position] = row
+            self.positions.append(position)
+        else:
+            # Remover a carta dos baldes do hash anterior
+            for key in self.bands(self.hashes[position]):
+                self.buckets[key].remove(row)
+        self.features[row] = feature
+        if self.coarse is not None:
+            self.coarse[row] = self.extract_coarse(feature)
+        
+        self.hashes[position] = self.perceptual_hash(feature)
+        for key in self.bands(self.hashes[position]):
+            self.buckets.setdefault(key, []).append(row)
+        return feature
+    
+    def feature(self, position):
+        return self.features[self.rows[position]]
+    
+    def scores(self, feature, rows=None, coarse=None):
+        """Calcula a similaridade de uma carta contra as conhecidas (todas ou só rows) em uma só operação."""
+        count = len(self.positions)
+        if rows is None:
+            # Fatias evitam copiar a matriz inteira
+            positions = self.positions
+            features = self.features[:count]
+            coarse_features = None if self.coarse is None else self.coarse[:count]
+            rows = np.arange(count)
+        else:
+            rows = np.asarray(rows, dtype=np.intp)
+            positions = [self.positions[row] for row in rows]
+            features = None
+            coarse_features = None if self.coarse is None else self.coarse[rows]
+        
+        if coarse is None or coarse_features is None:
+            if features is None:
+                features = self.features[rows]
+            return positions, features @ feature
+        
+        similarities = coarse_features @ coarse
+        close = similarities > self.coarse_threshold
+        similarities[~close] = -1.0
+        if close.any():
+            similarities[close] = self.features[rows[close]] @ feature
+        return positions, similarities
+    
+    def coarse_feature(self, position):
+        return None if self.coarse is None else self.coarse[self.rows[position]]
+    
+    def clear(self):
+        self.positions = []
+        self.rows = {}
+        self.hashes = {}
+        self.buckets = {}
+
+class CardFaceLibrary:
+    """Biblioteca em disco das faces de cartas já vistas, para reconhecê-las entre partidas."""
+    def __init__(self, feature_store, directory="./cardLibrary", max_faces=2048):
+        self.feature_store = feature_store  # usado para dividir os hashes em faixas
+        self.directory = directory
+        self.max_faces = max_faces  # ao salvar, só as faces mais recentes são mantidas
+        self.features = None  # faces salvas (memória mapeada)
+        self.hashes = []
+        self.new_features = []  # faces encontradas nesta sessão, ainda não salvas
+        self.buckets = {}  # (faixa, valor) -> ids das faces
+        self.load()
+    
+    def __len__(self):
+        saved = 0 if self.features is None else len(self.features)
+        return saved + len(self.new_features)
+    
+    def load(self):
+        features_path = os.path.join(self.directory, "features.npy")
+        hashes_path = os.path.join(self.directory, "hashes.npy")
+        if not os.path.exists(features_path) or not os.path.exists(hashes_path):
+            return
+        
+        features = np.load(features_path, mmap_mode="r")
+        if features.ndim != 2 or features.shape[1] != self.feature_store.dimension:
+            # Biblioteca gravada com outra resolução: começar uma nova
+            return
+        self.features = features
+        self.hashes = [int(value) for value in np.load(hashes_path)]
+        for face_id, hash_value in enumerate(self.hashes):
+            self._index(face_id, hash_value)
+    
+    def feature(self, face_id):
+        saved = 0 if self.features is None else len(self.features)
+        if face_id < saved:
+            return self.features[face_id]
+        return self.new_features[face_id - saved]
+    
+    def _index(self, face_id, hash_value):
+        for key in self.feature_store.bands(hash_value):
+            self.buckets.setdefault(key, []).append(face_id)
+    
+    def label(self, feature, hash_value, threshold):
+        """Retorna (id da face, similaridade) para uma captura, criando uma face nova se necessário."""
+        candidates = set()
+        for key in self.feature_store.bands(hash_value):
+            candidates.update(self.buckets.get(key, ()))
+        
+        best_id, best_score = self._best(feature, candidates)
+        if best_score <= threshold and len(candidates) < len(self):
+            # Nenhuma candidata confirmou: comparar com a biblioteca inteira
+            best_id, best_score = self._best_of_all(feature)
+        if best_score > threshold:
+            return best_id, best_score
+        
+        # Face nunca vista: adicionar à biblioteca
+        face_id = len(self)
+        self.new_features.append(np.array(feature, dtype=np.float32))
+        self.hashes.append(hash_value)
+        self._index(face_id, hash_value)
+        return face_id, 1.0
+    
+    def _best(self, feature, face_ids):
+        best_id, best_score = None, -1.0
+        for face_id in face_ids:
+            score = float(self.feature(face_id) @ feature)
+            if score > best_score:
+                best_id, best_score = face_id, score
+        return best_id, best_score
+    
+    def _best_of_all(self, feature):
+        scores = []
+        if self.features is not None and len(self.features):
+            scores.append(self.features @ feature)
+        if self.new_features:
+            scores.append(np.stack(self.new_features) @ feature)
+        if not scores:
+            return None, -1.0
+        scores = np.concatenate(scores)
+        best_id = int(np.argmax(scores))
+        return best_id, float(scores[best_id])
+    
+    def save(self):
+        """Grava as faces novas junto com as já existentes."""
+        if not self.new_features:
+            return
+        
+        os.makedirs(self.directory, exist_ok=True)
+        parts = [np.asarray(self.features)] if self.features is not None else []
+        features = np.concatenate(parts + [np.stack(self.new_features)])[-self.max_faces:]
+        hashes = self.hashes[-self.max_faces:]
+        
+        # Gravar em arquivos temporários e substituir, para não corromper a biblioteca
+        features_path = os.path.join(self.directory, "features.npy")
+        hashes_path = os.path.join(self.directory, "hashes.npy")
+        np.save(features_path + ".tmp.npy", features)
+        np.save(hashes_path + ".tmp.npy", np.array(hashes, dtype=np.uint64))
+        self.features = None
+        os.replace(features_path + ".tmp.npy", features_path)
+        os.replace(hashes_path + ".tmp.npy", hashes_path)
+        
+        # Os ids mudam quando faces antigas são descartadas: recarregar o índice
+        self.new_features = []
+        self.hashes = []
+        self.buckets = {}
+        self.load()
+
+class ReferenceBank:
+    """Banco de modelos montado a partir da área de referência (recompensas)."""
+    def __init__(self, feature_store, threshold=0.7, margin=0.05):
+        self.feature_store = feature_store
+        self.threshold = threshold  # similaridade mínima com a melhor referência
+        self.margin = margin        # distância mínima entre a melhor e a segunda referência
+        self.features = None
+    
+    def ready(self):
+        return self.features is not None and len(self.features) > 0
+    
+    def build(self, frame, reward_positions, origin):
+        """Extrai as características de cada célula a partir de uma captura da área de referência."""
+        area_x, area_y = origin
+        features = []
+        for _, _, x, y, width, height, _ in reward_positions:
+            cell = frame[y - area_y:y - area_y + height, x - area_x:x - area_x + width]
+            features.append(self.feature_store.extract(cell))
+        self.features = np.stack(features) if features else None
+    
+    def classify(self, feature):
+        """Retorna (índice da referência ou None, confiança) para uma carta."""
+        scores = self.features @ feature
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        second = float(scores[order[1]]) if len(order) > 1 else -1.0
+        if best > self.threshold and best - second > self.margin:
+            return int(order[0]), best
+        return None, best
+    
+    def clear(self):
+        self.features = None
+
+class ThresholdCalibrator:
+    """Ajusta o limiar de similaridade durante a partida a partir dos resultados confirmados na tela."""
+    def __init__(self, margin=0.05, floor=0.5, ceiling=0.98, min_samples=2):
+        self.margin = margin
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.clear()
+    
+    def clear(self):
+        self.pair_scores = []
+        self.non_pair_scores = []
+        self.ambiguous_count = 0
+        self.recaptures = 0
+    
+    def record(self, similarity, same):
+        (self.pair_scores if same else self.non_pair_scores).append(float(similarity))
+    
+    def threshold(self, base):
+        pairs = len(self.pair_scores) >= self.min_samples
+        non_pairs = len(self.non_pair_scores) >= self.min_samples
+        
+        if pairs and non_pairs:
+            lowest_pair = min(self.pair_scores)
+            highest_non_pair = max(self.non_pair_scores)
+            if lowest_pair <= highest_non_pair:
+                # Distribuições sobrepostas: manter o limiar base
+                return base
+            threshold = (lowest_pair + highest_non_pair) / 2
+        elif non_pairs:
+            threshold = max(base, max(self.non_pair_scores) + self.margin)
+        elif pairs:
+            # Sem não-pares confirmados, baixar o limiar é um palpite: no máximo margin abaixo da base
+            threshold = max(min(base, min(self.pair_scores) - self.margin), base - self.margin)
+        else:
+            return base
+        return min(max(threshold, self.floor), self.ceiling)
+    
+    def ambiguous(self, similarity, threshold):
+        return abs(similarity - threshold) < self.margin
+    
+    def state(self, base):
+        """Estado da calibração, para o log e o benchmark."""
+        return {
+            "threshold": self.threshold(base),
+            "pairs": len(self.pair_scores),
+            "non_pairs": len(self.non_pair_scores),
+            "lowest_pair": min(self.pair_scores) if self.pair_scores else None,
+            "highest_non_pair": max(self.non_pair_scores) if self.non_pair_scores else None,
+            "ambiguous": self.ambiguous_count,
+            "recaptures": self.recaptures,
+        }
+
+class CardImageWriter:
+    """Grava as capturas das cartas em disco em uma thread separada (modos None, "png", "png-fast", "npy" e "mmap")."""
+    def __init__(self, directory="./capturedCards", mode="png", max_queue=64, when_full="drop"):
+        self.directory = directory
+        self.mode = mode
+        self.when_full = when_full  # fila cheia: "drop" descarta a captura, "block" espera espaço
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.error_lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.archive = None
+        self.archive_path = None
+        self.card_count = 0
+        
+        # Sem gravação não há necessidade da thread
+        self.thread = None
+        if self.mode is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.thread = threading.Thread(target=self._run)
+            self.thread.daemon = True
+            self.thread.start()
+    
+    def start_game(self, card_count):
+        """Prepara a gravação de uma nova partida (novo arquivo no modo "mmap")."""
+        self.queue.join()
+        self.card_count = card_count
+        self.archive = None
+        self.archive_path = os.path.join(self.directory, f"game_{time.strftime('%Y%m%d_%H%M%S')}.npy")
+    
+    def submit(self, position, image):
+        """Enfileira uma captura para gravação sem bloquear o bot (exceto na política "block")."""
+        if self.mode is None or image is None:
+            return
+        
+        try:
+            # Cópia só da carta: a fatia manteria o frame inteiro na memória até a gravação
+            self.queue.put((position, image.copy()), block=self.when_full == "block")
+        except queue.Full:
+            self.dropped += 1
+    
+    def flush(self):
+        """Aguarda todas as capturas pendentes serem gravadas."""
+        self.queue.join()
+        if self.archive is not None:
+            self.archive.flush()
+    
+    def close(self):
+        """Grava as capturas pendentes e encerra a thread; capturas enviadas depois disso são ignoradas."""
+        if self.thread is None:
+            return
+        self.flush()
+        self.mode = None
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+    
+    def take_errors(self):
+        """Retorna (quantidade, último erro) dos erros de gravação desde a última chamada."""
+        with self.error_lock:
+            errors, last_error = self.errors, self.last_error
+            self.errors, self.last_error = 0, None
+        return errors, last_error
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            position, image = item
+            try:
+                self._write(position, image)
+            except Exception as e:
+                with self.error_lock:
+                    self.errors += 1
+                    self.last_error = f"carta {position}: {e}"
+            finally:
+                self.queue.task_done()
+    
+    def _write(self, position, image):
+        if self.mode == "npy":
+            np.save(os.path.join(self.directory, f"card_{position}.npy"), image)
+        elif self.mode == "mmap":
+            if self.archive is None:
+                # O arquivo da partida é criado com o tamanho da primeira carta
+                shape = (max(self.card_count, position + 1),) + image.shape
+                self.archive = np.lib.format.open_memmap(self.archive_path, mode="w+", dtype=image.dtype, shape=shape)
+            height = min(image.shape[0], self.archive.shape[1])
+            width = min(image.shape[1], self.archive.shape[2])
+            self.archive[position, :height, :width] = image[:height, :width]
+        else:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 0] if self.mode == "png-fast" else []
+            cv2.imwrite(os.path.join(self.directory, f"card_{position}.png"), cv2.cvtColor(image, cv2.COLOR_RGB2BGR), params)
+
+class LatencyHistogram:
+    """Histograma de latências com baldes logarítmicos (10 por década, de 1 µs a 1000 s)."""
+    BUCKETS_PER_DECADE = 10
+    MIN_SECONDS = 1e-6
+    BUCKET_COUNT = 90
+    
+    def __init__(self):
+        self.counts = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds):
+        if seconds <= self.MIN_SECONDS:
+            index = 0
+        else:
+            index = min(int(math.log10(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_DECADE), self.BUCKET_COUNT - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def percentile(self, percent):
+        if not self.count:
+            return 0.0
+        target = self.count * percent / 100
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= target:
+                upper = self.MIN_SECONDS * 10 ** ((index + 1) / self.BUCKETS_PER_DECADE)
+                return min(upper, self.max)
+        return self.max
+
+class TimingSpan:
+    """Mede o tempo de um trecho de código (usado com "with") e registra no histograma."""
+    __slots__ = ("histogram", "start")
+    
+    def __init__(self, histogram):
+        self.histogram = histogram
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+class PhaseMetrics:
+    """Histogramas de latência por fase (captura, comparação, clique, espera, pausa)."""
+    def __init__(self):
+        self.histograms = {}
+    
+    def span(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return TimingSpan(histogram)
+    
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(seconds)
+    
+    def summary(self):
+        """Resumo por fase, com tempos em milissegundos."""
+        return {
+            name: {
+                "count": histogram.count,
+                "total_ms": histogram.total * 1000,
+                "p50_ms": histogram.percentile(50) * 1000,
+                "p95_ms": histogram.percentile(95) * 1000,
+                "p99_ms": histogram.percentile(99) * 1000,
+                "max_ms": histogram.max * 1000,
+            }
+            for name, histogram in self.histograms.items()
+        }
+    
+    def export(self, path):
+        """Exporta o resumo em JSON ou CSV, conforme a extensão do arquivo."""
+        summary = self.summary()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["phase", "count", "total_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+                for name, values in summary.items():
+                    writer.writerow([name] + [round(value, 3) for value in values.values()])
+        else:
+            with open(path, "w") as file:
+                json.dump(summary, file, indent=2)
+    
+    def clear(self):
+        self.histograms = {}
+
+class SessionRecorder:
+    """Grava uma partida em um único arquivo binário, um registro por evento (lido de volta por read_recording)."""
+    RECORD = struct.Struct("<BdII")  # tipo, instante, tamanho do JSON, tamanho do array
+    KINDS = ("header", "frame", "capture", "click", "scores", "move", "summary")
+    
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+    
+    def write(self, kind, meta, array=None):
+        data = b""
+        if array is not None:
+            array = np.ascontiguousarray(array)
+            meta = dict(meta, dtype=array.dtype.str, shape=array.shape)
+            data = array.tobytes()
+        encoded = json.dumps(meta).encode("utf-8")
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(self.RECORD.pack(self.KINDS.index(kind), time.perf_counter() - self.start, len(encoded), len(data)))
+            self.file.write(encoded)
+            self.file.write(data)
+    
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+def read_recording(path):
+    """Lê uma gravação do SessionRecorder e organiza os eventos para o replay."""
+    recording = {"header": None, "frame": None, "captures": {}, "clicks": [], "scores": [], "moves": [], "pairs": [], "summary": None}
+    with open(path, "rb") as file:
+        while True:
+            raw = file.read(SessionRecorder.RECORD.size)
+            if len(raw) < SessionRecorder.RECORD.size:
+                break
+            kind, timestamp, meta_size, data_size = SessionRecorder.RECORD.unpack(raw)
+            meta = json.loads(file.read(meta_size))
+            array = None
+            if data_size:
+                array = np.frombuffer(file.read(data_size), dtype=meta["dtype"]).reshape(meta["shape"])
+            meta["time"] = timestamp
+            kind = SessionRecorder.KINDS[kind]
+            
+            if kind == "header":
+                recording["header"] = meta
+            elif kind == "summary":
+                recording["summary"] = meta
+            elif kind == "frame":
+                recording["frame"] = array
+            elif kind == "capture":
+                # A primeira captura de cada posição é a usada no replay
+                recording["captures"].setdefault(meta["position"], array)
+            elif kind == "scores":
+                recording["scores"].append((meta, array))
+            else:
+                recording[kind + "s"].append(meta)
+                if kind == "move" and meta["matched"]:
+                    recording["pairs"].append((meta["pos1"], meta["pos2"]))
+    return recording
+
+class ProfileStore:
+    """Perfis de configuração nomeados, gravados em um único arquivo JSON."""
+    thumbnail_size = (32, 32)
+    
+    def __init__(self, path="./profiles.json"):
+        self.path = path
+    
+    def load_all(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as file:
+            return json.load(file)
+    
+    def names(self):
+        return sorted(self.load_all())
+    
+    def get(self, name):
+        profiles = self.load_all()
+        if name not in profiles:
+            raise KeyError(f"perfil não encontrado: {name}")
+        return profiles[name]
+    
+    def save(self, name, profile):
+        profiles = self.load_all()
+        profiles[name] = profile
+        
+        # Gravar em um arquivo temporário e substituir, para não corromper os outros perfis
+        with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(profiles, file, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+    
+    @classmethod
+    def thumbnail(cls, frame):
+        """Miniatura em cinza da área, codificada em base64 para caber no JSON."""
+        gray = cv2.cvtColor(np.ascontiguousarray(frame), cv2.COLOR_RGB2GRAY)
+        small = cv2.resize(gray, cls.thumbnail_size, interpolation=cv2.INTER_AREA)
+        return base64.b64encode(small.tobytes()).decode("ascii")
+    
+    @classmethod
+    def thumbnail_similarity(cls, encoded, frame):
+        """Correlação normalizada entre a miniatura salva e a mesma área no frame atual."""
+        if frame.size == 0:
+            return 0.0  # área fora da tela
+        vectors = []
+        for data in (base64.b64decode(encoded), base64.b64decode(cls.thumbnail(frame))):
+            vector = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+            vector -= vector.mean()
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return float(vectors[0] @ vectors[1])
+
+class LogSink:
+    """Fila de mensagens de log segura entre threads, esvaziada em lotes pela thread do Tk."""
+    def __init__(self, level=logging.INFO, max_lines=1000, log_file=None, max_bytes=1_000_000, backup_count=3):
+        self.level = level
+        self.max_lines = max_lines
+        self.queue = queue.SimpleQueue()
+        self.status = None  # último texto de status pendente
+        self.widget_attached = False
+        
+        self.file_logger = None
+        if log_file is not None:
+            handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+            self.file_logger = logging.getLogger(f"MemoryGameBot.{id(self)}")
+            self.file_logger.propagate = False
+            self.file_logger.setLevel(logging.DEBUG)
+            self.file_logger.addHandler(handler)
+    
+    def enabled(self, level):
+        return level >= self.level and (self.widget_attached or self.file_logger is not None)
+    
+    def write(self, message, level=logging.INFO):
+        if not self.enabled(level):
+            return
+        if self.file_logger is not None:
+            self.file_logger.log(level, message)
+        if self.widget_attached:
+            self.queue.put(f"{time.strftime('%H:%M:%S')} - {message}\n")
+    
+    def set_status(self, text):
+        self.status = text
+    
+    def drain(self, log_text, status_label, max_batch=500):
+        """Move as mensagens pendentes para o widget em uma única inserção (thread do Tk)."""
+        if self.status is not None:
+            status_label.config(text=self.status)
+            self.status = None
+        
+        lines = []
+        try:
+            while len(lines) < max_batch:
+                lines.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not lines:
+            return
+        
+        log_text.insert(tk.END, "".join(lines))
+        
+        # Manter o widget como um buffer circular de max_lines linhas
+        line_count = int(log_text.index("end-1c").split(".")[0])
+        if line_count > self.max_lines:
+            log_text.delete("1.0", f"{line_count - self.max_lines + 1}.0")
+        log_text.see(tk.END)
+
+class BoardState:
+    """Estado da partida em arrays de tamanho fixo, um elemento por carta."""
+    __slots__ = ("card_count", "pair", "face", "seen", "matched", "tried", "face_ids")
+    
+    def __init__(self, card_count):
+        self.card_count = card_count
+        self.pair = np.full(card_count, -1, dtype=np.int32)  # posição do par conhecido (-1 = nenhum)
+        self.face = np.full(card_count, -1, dtype=np.int32)  # índice da face (-1 = desconhecida)
+        self.seen = np.zeros(card_count, dtype=bool)
+        self.matched = np.zeros(card_count, dtype=bool)
+        self.tried = np.eye(card_count, dtype=bool)  # combinações já jogadas (a própria carta conta como tentada)
+        self.face_ids = {}  # id da face (biblioteca ou referência) -> índice usado em face
+    
+    def reveal(self, position):
+        self.seen[position] = True
+    
+    def partner(self, position):
+        other = self.pair[position]
+        return None if other < 0 else int(other)
+    
+    def record_pair(self, pos1, pos2):
+        self.pair[pos1] = pos2
+        self.pair[pos2] = pos1
+    
+    def record_match(self, pos1, pos2):
+        self.record_pair(pos1, pos2)
+        self.matched[pos1] = True
+        self.matched[pos2] = True
+    
+    def forget_match(self, pos1, pos2):
+        """Desfaz um par que o jogo não aceitou."""
+        self.matched[pos1] = False
+        self.matched[pos2] = False
+        if self.pair[pos1] == pos2:
+            self.pair[pos1] = -1
+            self.pair[pos2] = -1
+    
+    def known_pair(self):
+        """Retorna um par já identificado e ainda não combinado, ou None."""
+        candidates = (self.pair >= 0) & ~self.matched
+        candidates[candidates] &= ~self.matched[self.pair[candidates]]
+        position = self.first(candidates)
+        return None if position is None else (position, int(self.pair[position]))
+    
+    def known_pairs(self):
+        """Todos os pares identificados e ainda não combinados, como (menor posição, maior posição)."""
+        positions = np.flatnonzero((self.pair >= 0) & ~self.matched)
+        return [(int(pos), int(self.pair[pos])) for pos in positions
+                if pos < self.pair[pos] and not self.matched[self.pair[pos]]]
+    
+    def all_pairs_known(self):
+        """True se toda carta ainda não combinada já tem o seu par identificado."""
+        open_positions = ~self.matched
+        return open_positions.any() and bool((self.pair[open_positions] >= 0).all())
+    
+    def next_unseen(self, exclude=None):
+        return self.first(~self.seen & ~self.matched, exclude)
+    
+    def next_unmatched(self, exclude=None):
+        return self.first(~self.matched, exclude)
+    
+    def record_attempt(self, pos1, pos2):
+        self.tried[pos1, pos2] = True
+        self.tried[pos2, pos1] = True
+    
+    def next_untried(self):
+        """Primeira carta não combinada que ainda tem uma combinação não jogada (ou a primeira não combinada)."""
+        open_positions = ~self.matched
+        untried = ~self.tried & open_positions[None, :]
+        position = self.first(open_positions & untried.any(axis=1))
+        return position if position is not None else self.next_unmatched()
+    
+    def untried_partner(self, position):
+        """Primeira carta não combinada ainda não jogada com a informada (ou a primeira não combinada)."""
+        partner = self.first(~self.tried[position] & ~self.matched)
+        return partner if partner is not None else self.next_unmatched(exclude=position)
+    
+    @staticmethod
+    def first(mask, exclude=None):
+        if exclude is not None:
+            mask[exclude] = False
+        position = int(np.argmax(mask))
+        return position if mask[position] else None
+    
+    def finished(self):
+        return int(self.matched.sum()) >= self.card_count - self.card_count % 2
+    
+    def assign_face(self, position, face_id):
+        """Associa a carta a uma face; numa recaptura a face anterior é substituída."""
+        self.face[position] = self.face_ids.setdefault(face_id, len(self.face_ids))
+    
+    def same_face(self, position):
+        """Posições (incluindo a própria) com a mesma face da carta informada."""
+        return np.flatnonzero(self.face == self.face[position])
+
+class MoveScheduler(abc.ABC):
+    """Base dos escalonadores: decide qual carta virar em cada metade da jogada."""
+    name = "base"
+    
+    # Estimativas de expected_moves, compartilhadas por todas as instâncias: (classe, cartas, simulações, semente) -> jogadas
+    _expected_cache = {}
+    
+    @abc.abstractmethod
+    def first_flip(self, knowledge):
+        """Carta a virar primeiro na jogada."""
+    
+    @abc.abstractmethod
+    def second_flip(self, knowledge, first_pos):
+        """Carta a virar depois de first_pos, ou None se não houver outra."""
+    
+    def expected_moves(self, card_count, trials=200, seed=0):
+        """Estima o número médio de jogadas simulando partidas com reconhecimento perfeito."""
+        key = (type(self), card_count, trials, seed)
+        if key in self._expected_cache:
+            return self._expected_cache[key]
+        
+        rng = random.Random(seed)
+        total = 0
+        
+        for _ in range(trials):
+            faces = [i // 2 for i in range(card_count)]
+            rng.shuffle(faces)
+            knowledge = BoardState(card_count)
+            first_seen = {}  # face -> primeira posição em que apareceu
+            moves = 0
+            
+            def reveal(position):
+                knowledge.reveal(position)
+                other = first_seen.setdefault(faces[position], position)
+                if other != position:
+                    knowledge.record_pair(position, other)
+            
+            while not knowledge.finished():
+                first_pos = self.first_flip(knowledge)
+                reveal(first_pos)
+                second_pos = self.second_flip(knowledge, first_pos)
+                if second_pos is None:
+                    break
+                reveal(second_pos)
+                moves += 1
+                
+                if faces[first_pos] == faces[second_pos]:
+                    knowledge.record_match(first_pos, second_pos)
+            total += moves
+        
+        self._expected_cache[key] = total / trials
+        return self._expected_cache[key]
+
+class SequentialScheduler(MoveScheduler):
+    """Estratégia original: vira todas as cartas em ordem e só depois combina os pares."""
+    name = "sequencial"
+    
+    def first_flip(self, knowledge):
+        position = knowledge.next_unseen()
+        if position is not None:
+            return position
+        pair = knowledge.known_pair()
+        if pair is not None:
+            return pair[0]
+        return knowledge.next_untried()
+    
+    def second_flip(self, knowledge, first_pos):
+        position = knowledge.next_unseen(exclude=first_pos)
+        if position is not None:
+            return position
+        pair_pos = knowledge.partner(first_pos)
+        if pair_pos is not None and not knowledge.matched[pair_pos]:
+            return pair_pos
+        return knowledge.untried_partner(first_pos)
+
+class GreedyScheduler(MoveScheduler):
+    """Combina um par conhecido assim que possível e só explora cartas novas quando não há nenhum."""
+    name = "gulosa"
+    
+    def first_flip(self, knowledge):
+        pair = knowledge.known_pair()
+        if pair is not None:
+            return pair[0]
+        position = knowledge.next_unseen()
+        if position is not None:
+            return position
+        return knowledge.next_untried()
+    
+    def second_flip(self, knowledge, first_pos):
+        # Se a primeira carta revelou um par conhecido, combiná-lo imediatamente
+        pair_pos = knowledge.partner(first_pos)
+        if pair_pos is not None and not knowledge.matched[pair_pos]:
+            return pair_pos
+        position = knowledge.next_unseen(exclude=first_pos)
+        if position is not None:
+            return position
+        return knowledge.untried_partner(first_pos)
 
 class MemoryGameBot:
-    def __init__(self, root):
+    def __init__(self, root, backend=None, persist_mode="png", log_file=None):
+        """Sem root (None) o bot roda sem interface, por exemplo com um SimulatedBoard como backend."""
         self.root = root
-        self.root.title("Bot Automático - Jogo da Memória")
-        self.root.geometry("800x600")
-        self.root.attributes("-topmost", True)
+        self.backend = backend if backend is not None else DesktopBackend()
+        self.input = ClickDispatcher(self.backend)
+        self.batch_pair_clicks = True  # pares conhecidos: os dois cliques em sequência
+        self.log_text = None
+        self.log_sink = LogSink(level=logging.INFO, log_file=log_file)
+        self.log_prefix = ""
+        
+        # Tarefas de interface vindas de outras threads, executadas pela thread do Tk
+        self.ui_tasks = queue.Queue()
         
         # Variáveis para áreas de jogo
         self.card_area = None
         self.reward_area = None
         self.grid_positions = []
         self.reward_positions = []
+        self.board_capture = None
+        
+        # Tabuleiros adicionais para o modo multi-tabuleiro: (card_area, linhas, colunas)
+        self.boards = []
+        self.runner = None
+        
+        # Dimensões das grades (linhas x colunas)
+        self.grid_rows = 4
+        self.grid_cols = 4
+        self.reward_rows = 2
+        self.reward_cols = 4
         
         # Controle de jogo
         self.running = False
         self.paused = False
-        self.card_images = {}
-        self.matched_cards = set()
-        self.known_cards = {}  # Armazena as cartas já vistas
-        self.card_pairs = {}   # Armazena os pares de cartas identificados
+        self.board_state = BoardState(0)  # pares, faces e cartas vistas/combinadas da partida
+        self.card_features = CardFeatureStore()
+        self.match_threshold = 0.85  # Similaridade mínima para considerar um par (limiar base)
+        self.calibrator = ThresholdCalibrator()  # ajusta o limiar durante a partida
+        self.recapture_ambiguous = True  # recapturar a carta quando a similaridade for ambígua
+        
+        # Biblioteca de faces entre partidas (--library; None desativa); com ela o par é achado pelo id da face
+        self.card_library = None
+        
+        # Modelos da área de referência, capturados no início de cada partida
+        self.reference_bank = ReferenceBank(self.card_features)
+        self.use_references = True
+        
+        # Modo contínuo: ao fim de cada partida, esperar o próximo tabuleiro e jogar de novo
+        self.continuous = False
+        self.max_games = None  # limite de partidas no modo contínuo (None = até parar)
+        self.new_board_timeout = 120.0  # tempo máximo esperando um novo tabuleiro (s)
+        self.new_board_fraction = 0.9  # fração das cartas que precisa mudar para ser um novo tabuleiro
+        self.games_played = 0
+        
+        # Estratégia de escolha das jogadas (None usa as duas fases originais)
+        self.scheduler = GreedyScheduler()
+        self.move_count = 0
         
         # Configuração do intervalo de tempo entre ações
         self.action_delay = 1.25  # Segundos entre ações
         
+        # Intervalo entre verificações de estabilidade do tabuleiro
+        self.settle_poll_interval = 0.05
+        
+        # Limite de jogadas por partida (por carta), para que uma carta mal lida não prenda o bot
+        self.max_moves_per_card = 4
+        
+        # Pares já conhecidos são jogados em sequência, com este intervalo mínimo entre cliques
+        # (o que o jogo aceita); os que não forem aceitos são repetidos com o dobro do intervalo
+        self.fast_path = True
+        self.min_input_interval = 0.05
+        self.learned_input_interval = 0.0  # intervalo que o jogo passou a exigir, mantido entre partidas
+        self.face_down_cells = None  # assinaturas das cartas viradas para baixo, do início da partida
+        self.flip_retries = 2  # cliques repetidos numa carta que não virou (clique ignorado pelo jogo)
+        
+        # Cartas de pares aceitos aguardando sumir da tela
+        self.pending_removals = set()
+        self.rejected_pairs = set()  # pares que o jogo devolveu virados para baixo
+        self.track_changes = True
+        
+        # Contadores de desempenho
+        self.click_count = 0
+        self.comparison_count = 0
+        
+        # Histogramas de latência por fase, exportados ao fim de cada partida ("json", "csv" ou None)
+        self.metrics = PhaseMetrics()
+        self.metrics_format = "json" if persist_mode is not None else None
+        self.metrics_directory = "./metrics"
+        
+        # Gravação das capturas em segundo plano
+        self.image_writer = CardImageWriter("./capturedCards", mode=persist_mode)
+        
+        # Gravação da partida para replay (None desativa)
+        self.record_directory = None
+        self.recorder = None
+        
+        # Perfis salvos: ao carregar, as áreas só são aceitas se a tela ainda bater com a miniatura
+        self.profile_store = ProfileStore()
+        self.profile_name = None
+        self.profile_check_threshold = 0.9
+        
+        if self.root is None:
+            return
+        
+        self.root.title("Bot Automático - Jogo da Memória")
+        self.root.geometry("800x600")
+        self.root.attributes("-topmost", True)
+        
         # Criação da interface
         self.create_widgets()
         
-        # Registrar tecla de parada
-        keyboard.add_hotkey('f7', self.stop_bot)
-
-        if not os.path.exists("./capturedCards"):
-            os.makedirs("./capturedCards")
+        # Esvaziar a fila de log periodicamente na thread do Tk
+        self.log_sink.widget_attached = True
+        self.drain_log()
         
     def create_widgets(self):
         # Frame de controle
@@ -53,6 +1828,29 @@ class MemoryGameBot:
         Button(control_frame, text="Iniciar Bot", command=self.start_bot).pack(side=tk.LEFT, padx=5)
         Button(control_frame, text="Parar Bot (F7)", command=self.stop_bot).pack(side=tk.LEFT, padx=5)
         
+        # Vários tabuleiros ao mesmo tempo
+        multi_frame = tk.Frame(self.root)
+        multi_frame.pack(pady=5)
+        
+        Button(multi_frame, text="Adicionar Tabuleiro", command=self.add_board).pack(side=tk.LEFT, padx=5)
+        Button(multi_frame, text="Iniciar Todos", command=self.start_all_boards).pack(side=tk.LEFT, padx=5)
+        
+        # Dimensões das grades
+        grid_frame = tk.Frame(self.root)
+        grid_frame.pack(pady=5)
+        
+        self.grid_rows_var = tk.IntVar(value=self.grid_rows)
+        self.grid_cols_var = tk.IntVar(value=self.grid_cols)
+        self.reward_rows_var = tk.IntVar(value=self.reward_rows)
+        self.reward_cols_var = tk.IntVar(value=self.reward_cols)
+        
+        Label(grid_frame, text="Cartas (linhas x colunas):").pack(side=tk.LEFT)
+        tk.Spinbox(grid_frame, from_=1, to=20, width=3, textvariable=self.grid_rows_var).pack(side=tk.LEFT)
+        tk.Spinbox(grid_frame, from_=1, to=20, width=3, textvariable=self.grid_cols_var).pack(side=tk.LEFT, padx=(0, 15))
+        Label(grid_frame, text="Referências (linhas x colunas):").pack(side=tk.LEFT)
+        tk.Spinbox(grid_frame, from_=1, to=20, width=3, textvariable=self.reward_rows_var).pack(side=tk.LEFT)
+        tk.Spinbox(grid_frame, from_=1, to=20, width=3, textvariable=self.reward_cols_var).pack(side=tk.LEFT)
+        
         # Área de status
         status_frame = tk.Frame(self.root)
         status_frame.pack(pady=10, fill=tk.X)
@@ -74,15 +1872,51 @@ class MemoryGameBot:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.log_text.config(yscrollcommand=scrollbar.set)
         scrollbar.config(command=self.log_text.yview)
+        
+        # Filtro de nível: as similaridades de cada comparação só aparecem no modo detalhado
+        self.verbose_log_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(log_frame, text="Log detalhado (similaridades)", variable=self.verbose_log_var,
+                       command=self.update_log_level).pack(anchor=tk.W, padx=10)
+        
+        # Modo contínuo: jogar a próxima partida assim que um novo tabuleiro aparecer
+        self.continuous_var = tk.BooleanVar(value=self.continuous)
+        tk.Checkbutton(control_frame, text="Jogar continuamente", variable=self.continuous_var).pack(side=tk.LEFT, padx=5)
+        
+        # Perfis: salvar as áreas e ajustes atuais, ou carregá-los sem selecionar as áreas
+        profile_frame = tk.Frame(self.root)
+        profile_frame.pack(pady=5, before=status_frame)
+        
+        self.profile_name_var = tk.StringVar(value=self.profile_name or "")
+        Label(profile_frame, text="Perfil:").pack(side=tk.LEFT)
+        tk.Entry(profile_frame, width=20, textvariable=self.profile_name_var).pack(side=tk.LEFT, padx=5)
+        Button(profile_frame, text="Salvar Perfil", command=lambda: self.save_profile(self.profile_name_var.get().strip())).pack(side=tk.LEFT, padx=5)
+        Button(profile_frame, text="Carregar Perfil", command=lambda: self.load_profile(self.profile_name_var.get().strip())).pack(side=tk.LEFT, padx=5)
+    
+    def update_log_level(self):
+        self.log_sink.level = logging.DEBUG if self.verbose_log_var.get() else logging.INFO
+    
+    def drain_log(self):
+        """Transfere o log pendente para o widget, executa as tarefas de interface pendentes e reagenda a si mesmo"""
+        self.log_sink.drain(self.log_text, self.status_text)
+        while True:
+            try:
+                task = self.ui_tasks.get_nowait()
+            except queue.Empty:
+                break
+            task()
+        self.root.after(100, self.drain_log)
     
     def select_card_area(self):
         """Permite ao usuário selecionar a área de cartas na tela"""
         self.status_text.config(text="Selecionando área de cartas...")
-        
-        result = self.select_area("cartas")
-        
+        self.select_area("cartas", self.card_area_selected)
+    
+    def card_area_selected(self, result):
+        """Chamado ao fim da seleção da área de cartas (None se cancelada)"""
         if result:
             self.card_area = result
+            self.grid_rows = self.grid_rows_var.get()
+            self.grid_cols = self.grid_cols_var.get()
             self.status_text.config(text="Área de cartas selecionada")
             self.create_card_grid()
         else:
@@ -91,19 +1925,21 @@ class MemoryGameBot:
     def select_reward_area(self):
         """Permite ao usuário selecionar a área de referência na tela"""
         self.status_text.config(text="Selecionando área de referência...")
-        
-        result = self.select_area("referência")
-        
+        self.select_area("referência", self.reward_area_selected)
+    
+    def reward_area_selected(self, result):
+        """Chamado ao fim da seleção da área de referência (None se cancelada)"""
         if result:
             self.reward_area = result
+            self.reward_rows = self.reward_rows_var.get()
+            self.reward_cols = self.reward_cols_var.get()
             self.status_text.config(text="Área de referência selecionada")
             self.create_reward_positions()
         else:
             self.status_text.config(text="Falha ao selecionar área de referência!")
     
-    def select_area(self, area_type, center_size_percentage=0.1):
-        """Interface para seleção de área na tela com proporção fixa e área central ignorada."""
-
+    def select_area(self, area_type, on_selected, center_size_percentage=0.1):
+        """Interface para seleção de área na tela; não bloqueia o Tk e entrega (x1, y1, x2, y2) ou None a on_selected."""
         # Instruções para o usuário
         if area_type == "cartas":
             msg = f"Selecione a área retangular que contém as cartas do jogo.\n\n" \
@@ -116,7 +1952,6 @@ class MemoryGameBot:
         self.area_coords = []
         self.ignore_center = False  # Indica se a área central deve ser ignorada
         self.center_coords = None  # Coordenadas da área central ignorada
-        self.selection_complete = False
         self.rect = None
 
         # Janela de seleção semi-transparente
@@ -175,50 +2010,51 @@ class MemoryGameBot:
                 y2, y1 = y1, y2
 
             self.area_coords = [x1, y1, x2, y2]
-            self.selection_complete = True
             self.selection_window.destroy()
 
             # Se for a área de cartas, definir a área central ignorada automaticamente
             if area_type == "cartas":
                 self.calculate_center_area(center_size_percentage)
+            
+            on_selected(tuple(self.area_coords))
+
+        def cancel_selection(event):
+            self.selection_window.destroy()
+            on_selected(None)
 
         self.selection_canvas.bind("<ButtonPress-1>", start_selection)
         self.selection_canvas.bind("<B1-Motion>", update_selection)
         self.selection_canvas.bind("<ButtonRelease-1>", end_selection)
 
         # Tecla Escape para cancelar
-        self.selection_window.bind("<Escape>", lambda e: self.selection_window.destroy())
-
-        # Espera a janela de seleção fechar
-        self.selection_window.wait_window(self.selection_window)
-
-        # Retorna as coordenadas se a seleção foi concluída
-        if self.selection_complete and len(self.area_coords) == 4:
-            return tuple(self.area_coords)
-        else:
-            return None
+        self.selection_window.bind("<Escape>", cancel_selection)
+    
+    def calculate_center_area(self, center_size_percentage):
+        """Define a área central de cada carta que será ignorada nas comparações."""
+        self.ignore_center = center_size_percentage > 0
+        
+        # Coordenadas relativas à carta (x, y, largura, altura), em frações do tamanho da carta
+        offset = (1 - center_size_percentage) / 2
+        self.center_coords = (offset, offset, center_size_percentage, center_size_percentage)
+        self.card_features.configure(center_ignore=center_size_percentage)
     
-    def create_card_grid(self):
-        """Cria uma grade de posições 4x4 dentro da área selecionada"""
+    def create_card_grid(self, preview=True):
+        """Cria uma grade de posições (grid_rows x grid_cols) dentro da área selecionada"""
         if not self.card_area:
             return
         
+        rows, cols = self.grid_rows, self.grid_cols
         x1, y1, x2, y2 = self.card_area
         width = x2 - x1
         height = y2 - y1
         
-        # Ajustar para uma grade quadrada
-        size = min(width, height)
-        x2 = x1 + size
-        y2 = y1 + size
-        self.card_area = (x1, y1, x2, y2)
-        
-        card_width = size / 4
-        card_height = size / 4
+        # Cartas retangulares: largura e altura de cada célula são independentes
+        card_width = width / cols
+        card_height = height / rows
         
         self.grid_positions = []
-        for row in range(4):
-            for col in range(4):
+        for row in range(rows):
+            for col in range(cols):
                 pos_x = x1 + col * card_width
                 pos_y = y1 + row * card_height
                 self.grid_positions.append((
@@ -230,11 +2066,15 @@ class MemoryGameBot:
                     int(card_height)   # Altura da carta
                 ))
         
+        # Captura única do tabuleiro, compartilhada por todas as cartas
+        self.board_capture = BoardCapture(self.card_area, self.grid_positions, self.backend, self.settle_poll_interval)
+        
         # Mostrar visualização da grade
-        self.show_grid_preview()
+        if preview and self.root is not None:
+            self.show_grid_preview()
     
-    def create_reward_positions(self):
-        """Cria posições para as referências em grade 4x2"""
+    def create_reward_positions(self, preview=True):
+        """Cria posições para as referências em grade (reward_cols x reward_rows)"""
         if not self.reward_area:
             return
         
@@ -242,9 +2082,9 @@ class MemoryGameBot:
         width = x2 - x1
         height = y2 - y1
         
-        # Criar posições de referência (4x2)
-        cols = 4
-        rows = 2
+        # Criar posições de referência
+        cols = self.reward_cols
+        rows = self.reward_rows
         reward_width = width / cols
         reward_height = height / rows
         
@@ -254,7 +2094,7 @@ class MemoryGameBot:
                 pos_x = x1 + col * reward_width
                 pos_y = y1 + row * reward_height
                 
-                # Índice da referência (0-7)
+                # Índice da referência (0 a cols*rows-1)
                 reward_index = row * cols + col
                 
                 self.reward_positions.append((
@@ -268,71 +2108,210 @@ class MemoryGameBot:
                 ))
         
         # Mostrar visualização da grade de referências
-        self.show_reward_preview()
+        if preview and self.root is not None:
+            self.show_reward_preview()
+    
+    def profile_settings(self):
+        """Configuração atual no formato de perfil: áreas, grades, limiares e tempos."""
+        return {
+            "card_area": list(self.card_area),
+            "grid": [self.grid_rows, self.grid_cols],
+            "reward_area": list(self.reward_area) if self.reward_area else None,
+            "reward_grid": [self.reward_rows, self.reward_cols],
+            "center_ignore": self.card_features.center_ignore,
+            "match_threshold": self.match_threshold,
+            "action_delay": self.action_delay,
+            "settle_poll_interval": self.settle_poll_interval,
+            "min_input_interval": self.min_input_interval,
+            "input_pause": self.input.pause,
+        }
+    
+    def save_profile(self, name):
+        """Salva as áreas e ajustes atuais com o nome informado, junto com as miniaturas da tela."""
+        if not name:
+            self.log("Informe um nome para o perfil")
+            return False
+        if not self.card_area:
+            self.log("Selecione a área de cartas antes de salvar o perfil")
+            return False
+        
+        profile = self.profile_settings()
+        profile["card_thumbnail"] = ProfileStore.thumbnail(self.backend.grab(self.card_area))
+        if self.reward_area:
+            profile["reward_thumbnail"] = ProfileStore.thumbnail(self.backend.grab(self.reward_area))
+        self.profile_store.save(name, profile)
+        self.profile_name = name
+        self.log(f"Perfil '{name}' salvo em {self.profile_store.path}")
+        return True
+    
+    def apply_profile(self, profile):
+        """Aplica um perfil e recria as grades; levanta ValueError, sem alterar nada, se o perfil for inválido."""
+        try:
+            card_area = tuple(profile["card_area"])
+            grid_rows, grid_cols = (int(value) for value in profile.get("grid", (self.grid_rows, self.grid_cols)))
+            reward_rows, reward_cols = (int(value) for value in profile.get("reward_grid", (self.reward_rows, self.reward_cols)))
+            reward_area = tuple(profile["reward_area"]) if profile.get("reward_area") else None
+            match_threshold = float(profile.get("match_threshold", self.match_threshold))
+            action_delay = float(profile.get("action_delay", self.action_delay))
+            settle_poll_interval = float(profile.get("settle_poll_interval", self.settle_poll_interval))
+            min_input_interval = float(profile.get("min_input_interval", self.min_input_interval))
+            input_pause = float(profile.get("input_pause", self.input.pause))
+            center_ignore = float(profile.get("center_ignore", self.card_features.center_ignore))
+        except KeyError as e:
+            raise ValueError(f"perfil sem o campo {e}") from e
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"perfil inválido: {e}") from e
+        if len(card_area) != 4 or (reward_area is not None and len(reward_area) != 4):
+            raise ValueError("perfil inválido: as áreas precisam de 4 coordenadas")
+        if min(grid_rows, grid_cols, reward_rows, reward_cols) < 1:
+            raise ValueError("perfil inválido: grade vazia")
+        
+        self.grid_rows, self.grid_cols = grid_rows, grid_cols
+        self.reward_rows, self.reward_cols = reward_rows, reward_cols
+        self.match_threshold = match_threshold
+        self.action_delay = action_delay
+        self.settle_poll_interval = settle_poll_interval
+        self.min_input_interval = min_input_interval
+        self.input.pause = input_pause
+        self.calculate_center_area(center_ignore)
+        
+        self.card_area = card_area
+        self.create_card_grid(preview=False)
+        if reward_area:
+            self.reward_area = reward_area
+            self.create_reward_positions(preview=False)
+        
+        if self.root is not None:
+            for variable, value in ((self.grid_rows_var, self.grid_rows), (self.grid_cols_var, self.grid_cols),
+                                    (self.reward_rows_var, self.reward_rows), (self.reward_cols_var, self.reward_cols)):
+                variable.set(value)
+    
+    def check_profile(self, profile):
+        """Compara as miniaturas do perfil com a tela atual e retorna a menor similaridade (None sem miniaturas)."""
+        scores = []
+        for area_key, thumbnail_key in (("card_area", "card_thumbnail"), ("reward_area", "reward_thumbnail")):
+            if profile.get(area_key) and profile.get(thumbnail_key):
+                frame = self.backend.grab(tuple(profile[area_key]))
+                scores.append(ProfileStore.thumbnail_similarity(profile[thumbnail_key], frame))
+        return min(scores) if scores else None
+    
+    def load_profile(self, name, autostart=False):
+        """Carrega um perfil salvo e confere em segundo plano se as áreas ainda batem com a tela."""
+        if self.running:
+            self.log("Pare o bot antes de carregar um perfil")
+            return False
+        try:
+            profile = self.profile_store.get(name)
+            self.apply_profile(profile)
+        except (KeyError, OSError, ValueError) as e:
+            self.log(f"Erro ao carregar o perfil: {e}")
+            return False
+        
+        self.profile_name = name
+        self.log(f"Perfil '{name}' carregado: cartas {self.grid_rows}x{self.grid_cols} em {self.card_area}")
+        
+        def check():
+            try:
+                score = self.check_profile(profile)
+            except Exception as e:
+                self.log(f"Erro ao conferir o perfil com a tela: {e}")
+                return
+            if score is not None and score < self.profile_check_threshold:
+                self.log(f"A tela não confere com o perfil '{name}' (similaridade {score:.2f}); selecione as áreas novamente")
+                self.set_status("Perfil não confere com a tela")
+                return
+            self.log(f"Perfil '{name}' conferido com a tela" + (f" (similaridade {score:.2f})" if score is not None else ""))
+            self.set_status(f"Perfil '{name}' pronto")
+            if autostart and self.root is not None:
+                self.ui_tasks.put(self.start_bot)
+        
+        threading.Thread(target=check, daemon=True).start()
+        return True
+    
+    def render_preview(self, area, size, show):
+        """Captura e redimensiona a área em uma thread de trabalho e entrega a imagem à thread do Tk."""
+        def render():
+            try:
+                x1, y1, x2, y2 = area
+                region = self.backend.grab((max(x1, 0), max(y1, 0), max(x2, 0), max(y2, 0)))
+                image = Image.fromarray(region).resize(size, Image.BILINEAR)
+            except Exception as e:
+                self.log(f"Erro ao gerar a prévia: {e}")
+                return
+            self.ui_tasks.put(lambda: show(image))
+        
+        threading.Thread(target=render, daemon=True).start()
     
     def show_grid_preview(self):
-        """Mostra uma prévia da grade de cartas"""
+        """Mostra uma prévia da grade de cartas (a imagem é preparada em segundo plano)"""
         if not self.card_area:
             return
-            
+        
+        # Redimensionar mantendo a proporção
+        new_width = 400
+        new_height = int(new_width * self.grid_rows / self.grid_cols)
+        self.render_preview(self.card_area, (new_width, new_height), self.draw_grid_preview)
+    
+    def draw_grid_preview(self, screenshot):
         preview_window = tk.Toplevel(self.root)
         preview_window.title("Prévia da Grade de Cartas")
         preview_window.attributes("-topmost", True)
         
-        x1, y1, x2, y2 = self.card_area
-        screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
-        screenshot = screenshot.resize((400, 400), Image.LANCZOS)
+        rows, cols = self.grid_rows, self.grid_cols
+        new_width, new_height = screenshot.size
         tk_img = ImageTk.PhotoImage(screenshot)
         
         # Manter referência para evitar coleta de lixo
         preview_window.tk_img = tk_img
         
-        canvas = Canvas(preview_window, width=400, height=400)
+        canvas = Canvas(preview_window, width=new_width, height=new_height)
         canvas.pack()
         
         # Desenhar a imagem
         canvas.create_image(0, 0, anchor="nw", image=tk_img)
         
         # Desenhar a grade
-        for i in range(1, 4):
+        cell_width = new_width / cols
+        cell_height = new_height / rows
+        for i in range(1, rows):
             # Linhas horizontais
-            canvas.create_line(0, i * 100, 400, i * 100, fill="red", width=2)
+            canvas.create_line(0, i * cell_height, new_width, i * cell_height, fill="red", width=2)
+        for i in range(1, cols):
             # Linhas verticais
-            canvas.create_line(i * 100, 0, i * 100, 400, fill="red", width=2)
+            canvas.create_line(i * cell_width, 0, i * cell_width, new_height, fill="red", width=2)
         
         # Numerar as posições
-        for row in range(4):
-            for col in range(4):
-                pos = row * 4 + col
+        for row in range(rows):
+            for col in range(cols):
+                pos = row * cols + col
                 canvas.create_text(
-                    col * 100 + 50,
-                    row * 100 + 50,
+                    col * cell_width + cell_width/2,
+                    row * cell_height + cell_height/2,
                     text=str(pos),
                     fill="white",
                     font=("Arial", 14, "bold")
                 )
         
-        Label(preview_window, text="Grade 4x4 de cartas definida. Feche esta janela para continuar.").pack(pady=10)
+        Label(preview_window, text=f"Grade {rows}x{cols} de cartas definida. Feche esta janela para continuar.").pack(pady=10)
         Button(preview_window, text="OK", command=preview_window.destroy).pack(pady=10)
     
     def show_reward_preview(self):
-        """Mostra uma prévia da área de referências 4x2"""
+        """Mostra uma prévia da área de referências (a imagem é preparada em segundo plano)"""
         if not self.reward_area:
             return
-            
-        preview_window = tk.Toplevel(self.root)
-        preview_window.title("Prévia da Área de Referência")
-        preview_window.attributes("-topmost", True)
-        
-        x1, y1, x2, y2 = self.reward_area
-        screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
         
         # Redimensionar mantendo a proporção
-        width, height = screenshot.size
+        x1, y1, x2, y2 = self.reward_area
         new_width = 400
-        new_height = int((new_width / width) * height)
+        new_height = int((new_width / (x2 - x1)) * (y2 - y1))
+        self.render_preview(self.reward_area, (new_width, new_height), self.draw_reward_preview)
+    
+    def draw_reward_preview(self, screenshot):
+        preview_window = tk.Toplevel(self.root)
+        preview_window.title("Prévia da Área de Referência")
+        preview_window.attributes("-topmost", True)
         
-        screenshot = screenshot.resize((new_width, new_height), Image.LANCZOS)
+        new_width, new_height = screenshot.size
         tk_img = ImageTk.PhotoImage(screenshot)
         
         # Manter referência para evitar coleta de lixo
@@ -344,29 +2323,31 @@ class MemoryGameBot:
         # Desenhar a imagem
         canvas.create_image(0, 0, anchor="nw", image=tk_img)
         
-        # Desenhar linhas de grade 4x2
-        cell_width = new_width / 4
-        cell_height = new_height / 2
+        # Desenhar linhas de grade
+        rows, cols = self.reward_rows, self.reward_cols
+        cell_width = new_width / cols
+        cell_height = new_height / rows
         
-        # Linhas verticais (3 divisórias = 4 colunas)
-        for i in range(1, 4):
+        # Linhas verticais (cols - 1 divisórias)
+        for i in range(1, cols):
             canvas.create_line(
                 i * cell_width, 0, 
                 i * cell_width, new_height, 
                 fill="red", width=2
             )
         
-        # Linha horizontal do meio (1 divisória = 2 linhas)
-        canvas.create_line(
-            0, cell_height, 
-            new_width, cell_height, 
-            fill="red", width=2
-        )
+        # Linhas horizontais (rows - 1 divisórias)
+        for i in range(1, rows):
+            canvas.create_line(
+                0, i * cell_height, 
+                new_width, i * cell_height, 
+                fill="red", width=2
+            )
         
         # Numerar as posições
-        for row in range(2):
-            for col in range(4):
-                pos = row * 4 + col
+        for row in range(rows):
+            for col in range(cols):
+                pos = row * cols + col
                 canvas.create_text(
                     col * cell_width + cell_width/2,
                     row * cell_height + cell_height/2,
@@ -375,7 +2356,7 @@ class MemoryGameBot:
                     font=("Arial", 14, "bold")
                 )
         
-        Label(preview_window, text="Grade 4x2 de referências definida. Feche esta janela para continuar.").pack(pady=10)
+        Label(preview_window, text=f"Grade {cols}x{rows} de referências definida. Feche esta janela para continuar.").pack(pady=10)
         Button(preview_window, text="OK", command=preview_window.destroy).pack(pady=10)
     
     def start_bot(self):
@@ -389,10 +2370,8 @@ class MemoryGameBot:
             return
         
         self.running = True
-        self.paused = False
-        self.matched_cards = set()
-        self.known_cards = {}
-        self.card_pairs = {}
+        self.continuous = self.continuous_var.get()
+        self.reset_game()
         
         self.status_text.config(text="Bot iniciado - Pressione F7 para parar")
         self.log("Bot iniciado")
@@ -402,265 +2381,1296 @@ class MemoryGameBot:
         self.bot_thread.daemon = True
         self.bot_thread.start()
     
+    def reset_game(self):
+        """Limpa o estado da partida anterior"""
+        self.paused = False
+        self.board_state = BoardState(len(self.grid_positions))
+        self.card_features.clear()
+        self.pending_removals = set()
+        self.rejected_pairs = set()
+        self.calibrator.clear()
+        self.move_count = 0
+        self.click_count = 0
+        self.comparison_count = 0
+        self.metrics.clear()
+        self.image_writer.start_game(len(self.grid_positions))
+    
+    def start_warm_up(self):
+        """Carrega em segundo plano o que só é usado depois da seleção das áreas."""
+        def warm_up():
+            start = time.perf_counter()
+            for module in (cv2, Image, ImageTk):
+                module.load()
+            if isinstance(self.backend, DesktopBackend):
+                self.backend.load()
+            
+            # Registrar tecla de parada
+            try:
+                import keyboard
+                keyboard.add_hotkey('f7', self.stop_bot)
+            except Exception as e:
+                self.log(f"Tecla de parada (F7) indisponível: {e}")
+            self.log(f"Módulos carregados em segundo plano em {time.perf_counter() - start:.2f}s", logging.DEBUG)
+        
+        threading.Thread(target=warm_up, daemon=True).start()
+    
+    def set_status(self, text):
+        """Atualiza o status; pode ser chamado de qualquer thread"""
+        self.log_sink.set_status(text)
+    
+    def add_board(self):
+        """Guarda a área de cartas atual como um dos tabuleiros do modo multi-tabuleiro"""
+        if not self.card_area:
+            messagebox.showerror("Erro", "Selecione a área de cartas do tabuleiro primeiro!")
+            return
+        
+        self.boards.append((self.card_area, self.grid_rows, self.grid_cols))
+        self.log(f"Tabuleiro {len(self.boards) - 1} adicionado: área {self.card_area}, grade {self.grid_rows}x{self.grid_cols}")
+    
+    def start_all_boards(self):
+        """Inicia um bot por tabuleiro adicionado, com captura e cliques compartilhados"""
+        if not self.boards:
+            messagebox.showerror("Erro", "Adicione pelo menos um tabuleiro primeiro!")
+            return
+        
+        if self.runner is not None and self.runner.running():
+            messagebox.showinfo("Aviso", "Os tabuleiros já estão em execução!")
+            return
+        
+        self.runner = MultiBoardRunner(self.boards, self.backend, log_sink=self.log_sink, persist_mode="png")
+        self.runner.start()
+        self.set_status(f"{len(self.boards)} tabuleiros iniciados - Pressione F7 para parar")
+    
     def stop_bot(self):
         """Para a execução do bot"""
+        if self.runner is not None and self.runner.running():
+            self.runner.stop()
+            self.set_status("Bots parados")
+            self.log("Bots parados")
+        
         if self.running:
             self.running = False
             self.paused = False
-            self.status_text.config(text="Bot parado")
+            self.set_status("Bot parado")
             self.log("Bot parado")
     
-    def log(self, message):
-        """Adiciona uma mensagem ao log"""
-        self.log_text.insert(tk.END, f"{time.strftime('%H:%M:%S')} - {message}\n")
-        self.log_text.see(tk.END)
+    def log(self, message, level=logging.INFO):
+        """Adiciona uma mensagem ao log (a escrita no widget é feita pela thread do Tk)"""
+        self.log_sink.write(self.log_prefix + message, level)
     
-    def capture_card_image(self, position):
-        """Captura a imagem de uma carta na posição específica e salva em arquivo."""
+    def capture_card_image(self, position, frame=None):
+        """Captura a imagem de uma carta na posição específica (do frame informado, se houver) e salva em arquivo."""
         if position >= len(self.grid_positions):
             return None
         
-        _, _, x, y, width, height = self.grid_positions[position]
-        screenshot = ImageGrab.grab(bbox=(x, y, x + width, y + height))
-        img_array = np.array(screenshot)
-        
-        # Salvar a imagem em um arquivo
-        cv2.imwrite(os.path.join("./capturedCards", f"card_{position}.png"), cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR))
+        with self.metrics.span("capture"):
+            if frame is None:
+                frame = self.board_capture.grab()
+            img_array = self.board_capture.card_view(position, frame)
+            
+            # Salvar a imagem em um arquivo (em segundo plano)
+            self.image_writer.submit(position, img_array)
+            if self.recorder is not None:
+                self.recorder.write("capture", {"position": position}, img_array)
         
         return img_array
     
-    def compare_images(self, img1, img2, basePos, comparePos):
-        """Compara duas imagens para verificar se são a mesma carta."""
-        if img1 is None or img2 is None:
-            return False
+    def find_matching_card(self, position, exclude=(), recapture=False):
+        """Procura um par para a carta entre as conhecidas; com recapture, uma similaridade ambígua recaptura a carta (ainda virada) antes de decidir."""
+        state = self.board_state
+        threshold = self.similarity_threshold()
+        if state.face[position] >= 0:
+            for pos in state.same_face(position):
+                if pos != position and not state.matched[pos] and pos not in exclude:
+                    if self.card_similarity(position, pos) > threshold:
+                        return int(pos)
+            # O id da face e a correlação discordam: decidir pela correlação com todas as cartas
+        
+        match, best = self.scan_for_match(position, exclude, threshold)
+        if best is not None and self.calibrator.ambiguous(best, threshold):
+            self.calibrator.ambiguous_count += 1
+            if recapture and self.recapture_ambiguous:
+                frame = self.board_capture.grab()
+                if not self.is_face_down(position, frame):
+                    self.log(f"Similaridade ambígua para a carta {position} ({best:.3f}): recapturando a carta")
+                    self.calibrator.recaptures += 1
+                    self.store_card(position, self.capture_card_image(position, frame))
+                    match, best = self.scan_for_match(position, exclude, threshold)
+        return match
+    
+    def scan_for_match(self, position, exclude, threshold):
+        """Compara a carta com as conhecidas; retorna a primeira acima do limiar (na ordem em que foram vistas) e a maior similaridade."""
+        state = self.board_state
+        with self.metrics.span("compare"):
+            rows = None
+            if self.card_features.use_buckets(len(self.grid_positions)):
+                rows = self.card_features.candidates(position)
+            positions, similarities = self.card_features.scores(
+                self.card_features.feature(position), rows, self.card_features.coarse_feature(position))
+        self.comparison_count += len(positions)
+        if self.recorder is not None:
+            self.recorder.write("scores", {"position": position, "positions": list(positions)},
+                                np.asarray(similarities, dtype=np.float32))
+        
+        log_similarity = self.log_sink.enabled(logging.DEBUG)
+        match = None
+        best = None
+        for pos, similarity in zip(positions, similarities):
+            if pos == position or state.matched[pos] or pos in exclude:
+                continue
+            
+            # log
+            if log_similarity:
+                self.log(f"similarity na carta {position} - {pos} :({similarity})", logging.DEBUG)
+            
+            best = similarity if best is None else max(best, similarity)
+            if match is None and similarity > threshold:
+                match = pos
+        return match, best
+    
+    def build_reference_bank(self):
+        """Captura a área de referência uma vez e monta o banco de modelos"""
+        if not self.use_references or not self.reward_area or not self.reward_positions:
+            self.reference_bank.clear()
+            return
+        
+        frame = self.backend.grab(self.reward_area)
+        self.reference_bank.build(frame, self.reward_positions, self.reward_area[:2])
+        self.log(f"Banco de referências montado com {len(self.reward_positions)} modelos")
+    
+    def reverify_pairs(self):
+        """Compara todas as cartas conhecidas entre si e registra os pares ainda não identificados."""
+        count = len(self.card_features.positions)
+        if count < 2:
+            return 0
         
-        # Converter para escala de cinza
-        img1_gray = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-        img2_gray = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
+        features = self.card_features.features[:count]
+        with self.metrics.span("reverify"):
+            scores = features @ features.T
+        self.comparison_count += count * (count - 1) // 2
         
-        # Redimensionar para garantir o mesmo tamanho
-        img1_gray = cv2.resize(img1_gray, (100, 100))
-        img2_gray = cv2.resize(img2_gray, (100, 100))
+        positions = self.card_features.positions
+        threshold = self.similarity_threshold()
+        found = 0
+        state = self.board_state
+        for i, pos1 in enumerate(positions):
+            if state.matched[pos1] or state.pair[pos1] >= 0:
+                continue
+            for j, pos2 in enumerate(positions):
+                if j == i or state.matched[pos2] or state.pair[pos2] >= 0:
+                    continue
+                if frozenset((pos1, pos2)) in self.rejected_pairs:
+                    continue
+                if scores[i, j] > threshold:
+                    self.log(f"Par identificado na reverificação: cartas {pos1} e {pos2}")
+                    state.record_pair(pos1, pos2)
+                    found += 1
+                    break
+        return found
+    
+    def store_card(self, position, image):
+        """Extrai as características da carta (e o id da face); a captura em si não é guardada."""
+        feature = self.card_features.add(position, image)
         
-        # Calcular a diferença entre as imagens
-        similarity = cv2.matchTemplate(img1_gray, img2_gray, cv2.TM_CCOEFF_NORMED)
-        max_similarity = np.max(similarity)
+        if self.reference_bank.ready():
+            with self.metrics.span("label"):
+                index, confidence = self.reference_bank.classify(feature)
+            if index is not None:
+                self.log(f"Carta {position} classificada como referência {index} (confiança {confidence:.2f})")
+                self.assign_face(position, ("ref", index))
+                return
+            self.log(f"Carta {position} sem referência confiável (melhor similaridade {confidence:.2f})")
         
-        # log
-        self.log(f"similarity na carta {basePos} - {comparePos} :({max_similarity})")
-
-        # Considerar igual se a similaridade for maior que 0.85 (valor ajustado)
-        return max_similarity > 0.85
+        if self.card_library is not None:
+            with self.metrics.span("label"):
+                face_id, similarity = self.card_library.label(feature, self.card_features.hashes[position], self.similarity_threshold())
+            self.log(f"Carta {position} reconhecida como face {face_id} ({similarity:.2f})", logging.DEBUG)
+            self.assign_face(position, face_id)
+    
+    def assign_face(self, position, face_id):
+        self.board_state.assign_face(position, face_id)
     
     def click_card(self, position):
-        """Clica em uma carta na posição especificada e move o mouse."""
+        """Clica em uma carta na posição especificada (o mouse fica onde está)."""
         if position >= len(self.grid_positions):
             return
         
         x, y, _, _, _, _ = self.grid_positions[position]
         self.log(f"Clicando na carta {position} (x={x}, y={y})")
-        pyautogui.click(x, y)
-        
-        # Mover o mouse para fora da área das cartas
-        self.move_mouse_away()
+        with self.metrics.span("click"):
+            self.input.click(x, y)
+        self.click_count += 1
+        if self.recorder is not None:
+            self.recorder.write("click", {"position": position})
 
+    def wait_for_settle(self, reference=None, positions=None):
+        """Aguarda a animação das cartas terminar, usando action_delay como tempo máximo."""
+        if self.board_capture is None:
+            with self.metrics.span("sleep"):
+                time.sleep(self.action_delay)
+            return None
+        with self.metrics.span("settle"):
+            return self.board_capture.wait_until_stable(self.action_delay, reference, positions=positions)
+    
+    def cell_references(self, positions, frame=None):
+        """Assinaturas das cartas informadas, para esperar que elas mudem."""
+        if frame is None:
+            frame = self.board_capture.grab()
+        return [self.board_capture.cell_signature(position, frame) for position in positions]
+    
+    def flip_cards(self, positions):
+        """Clica nas cartas e aguarda cada uma virar; as que nunca mudaram (clique ignorado) são clicadas de novo."""
+        capture = self.board_capture
+        references = dict(zip(positions, self.cell_references(positions)))
+        pending = list(positions)
+        
+        for attempt in range(1 + self.flip_retries):
+            if attempt:
+                self.log(f"Cartas {pending} não viraram; clicando de novo", logging.DEBUG)
+            for position in pending:
+                self.click_card(position)
+            self.move_mouse_away()
+            frame = self.wait_for_settle([references[position] for position in pending], positions=pending)
+            
+            # Uma carta que virou e já desvirou recebeu o clique; só as que nunca mudaram são repetidas
+            pending = [position for position in pending if position not in capture.changed_positions]
+            if not pending:
+                break
+        return frame
+    
+    def flip_card(self, position):
+        """Clica em uma carta e aguarda ela virar, retornando o frame final."""
+        return self.flip_cards((position,))
+    
+    def flip_pair(self, pos1, pos2):
+        """Clica nas duas cartas de um par conhecido em sequência e aguarda uma única vez."""
+        return self.flip_cards((pos1, pos2))
+    
+    def wait_for_pair(self, pos1, pos2, revealed):
+        """Aguarda as duas cartas mostradas em revealed mudarem (sumirem ou desvirarem) e pararem."""
+        positions = (pos1, pos2)
+        return self.wait_for_settle(self.cell_references(positions, revealed), positions=positions)
+    
+    def is_face_down(self, position, frame):
+        """True se a carta ainda tem a aparência do início da partida (virada para baixo)."""
+        if self.face_down_cells is None or frame is None:
+            return False
+        capture = self.board_capture
+        return not capture.region_changed(capture.cell_signature(position, frame), self.face_down_cells[position])
+    
     def move_mouse_away(self):
-        """Move o mouse para uma posição fora da área das cartas."""
-        x = 100
-        y = 100
-        pyautogui.moveTo(x, y)    
+        """Move o mouse para fora da área das cartas antes de ler a tela, se ele estiver sobre ela."""
+        if self.input.needs_park():
+            with self.metrics.span("park"):
+                self.input.park()
     
     def run_bot(self):
-        """Lógica principal do bot"""
+        """Lógica principal do bot: uma partida, ou partidas seguidas no modo contínuo"""
+        try:
+            if self.continuous:
+                self.run_continuous()
+            else:
+                self.play_game()
+        finally:
+            self.running = False
+    
+    def run_continuous(self):
+        """Joga partidas seguidas até o bot ser parado, sem reconfigurar as áreas entre elas."""
+        self.games_played = 0
+        session_start = time.perf_counter()
+        
+        while self.running:
+            if not self.play_game():
+                break
+            self.games_played += 1
+            
+            rate = self.games_played / (time.perf_counter() - session_start) * 3600
+            self.log(f"{self.games_played} partidas concluídas ({rate:.1f} partidas por hora)")
+            self.set_status(f"{self.games_played} partidas concluídas - {rate:.1f} por hora")
+            if self.max_games is not None and self.games_played >= self.max_games:
+                break
+            
+            self.log("Aguardando um novo tabuleiro...")
+            if not self.wait_for_new_board():
+                self.log("Nenhum tabuleiro novo apareceu; encerrando o modo contínuo")
+                break
+            self.reset_game()
+    
+    def wait_for_new_board(self):
+        """Aguarda a maior parte das cartas mudar; True quando um tabuleiro novo e estável aparece."""
+        finished = self.board_capture.cell_signatures()
+        required = max(1, int(len(finished) * self.new_board_fraction))
+        deadline = time.monotonic() + self.new_board_timeout
+        
+        with self.metrics.span("new_board"):
+            while self.running and time.monotonic() < deadline:
+                frame = self.board_capture.wait_until_stable(self.action_delay)
+                current = self.board_capture.cell_signatures(frame)
+                changed = sum(self.board_capture.region_changed(cell, old) for cell, old in zip(current, finished))
+                if changed >= required:
+                    return True
+        return False
+    
+    def play_game(self):
+        """Joga uma partida; retorna True se ela terminou sem erro e sem o bot ser parado"""
+        completed = False
         try:
             # Inicializar o jogo
             self.log("Iniciando partida...")
-            time.sleep(self.action_delay)  # Pequena pausa para o jogo iniciar
-            
-            # Primeiro passo: descobrir e memorizar todas as cartas
-            self.discover_all_cards()
+            noise = self.board_capture.measure_noise()
+            self.log(f"Ruído da captura: {noise:.1f} (tolerância {self.board_capture.pixel_tolerance:.0f})", logging.DEBUG)
+            frame = self.wait_for_settle()  # Aguardar o tabuleiro estabilizar para o jogo iniciar
+            self.face_down_cells = self.board_capture.cell_signatures(frame)
+            self.start_recording(frame)
+            self.build_reference_bank()
             
-            # Segundo passo: combinar os pares identificados
-            self.match_all_pairs()
+            finished = True
+            if self.scheduler is not None:
+                # Descobrir e combinar as cartas na ordem escolhida pelo escalonador
+                finished = self.play_scheduled()
+            else:
+                # Primeiro passo: descobrir e memorizar todas as cartas
+                self.discover_all_cards()
+                
+                # Segundo passo: combinar os pares identificados
+                self.match_all_pairs()
             
             # Concluir o jogo
-            self.log("Jogo concluído!")
-            self.status_text.config(text="Jogo concluído")
+            if finished:
+                self.log("Jogo concluído!")
+                self.set_status("Jogo concluído")
+            else:
+                self.set_status("Partida abortada")
+            completed = self.running and finished
             
         except Exception as e:
             self.log(f"Erro: {str(e)}")
         finally:
-            self.running = False
+            self.report_metrics()
+            self.stop_recording()
+            
+            # Guardar as faces novas para as próximas partidas
+            if self.card_library is not None:
+                try:
+                    self.card_library.save()
+                except OSError as e:
+                    self.log(f"Erro ao salvar a biblioteca de faces: {e}")
+        return completed
+    
+    def start_recording(self, frame):
+        """Abre a gravação da partida, se habilitada, com a geometria e o tabuleiro inicial"""
+        if self.record_directory is None:
+            return
+        try:
+            os.makedirs(self.record_directory, exist_ok=True)
+            path = os.path.join(self.record_directory, f"game_{time.strftime('%Y%m%d_%H%M%S')}_{id(self):x}.mgrec")
+            self.recorder = SessionRecorder(path)
+        except OSError as e:
+            self.log(f"Erro ao abrir a gravação: {e}")
+            return
+        
+        self.recorder.write("header", {
+            "rows": self.grid_rows, "cols": self.grid_cols,
+            "card_area": list(self.card_area), "grid_positions": [list(p) for p in self.grid_positions],
+            "card_width": self.grid_positions[0][4], "card_height": self.grid_positions[0][5],
+            "threshold": self.match_threshold,
+            "scheduler": self.scheduler.name if self.scheduler is not None else "fases",
+        })
+        if frame is not None:
+            self.recorder.write("frame", {}, frame)
+        self.log(f"Gravando a partida em {self.recorder.path}")
+    
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        self.recorder.write("summary", {
+            "moves": self.move_count, "clicks": self.click_count, "comparisons": self.comparison_count,
+            "metrics": self.metrics.summary(),
+        })
+        self.recorder.close()
+        self.recorder = None
+    
+    def report_metrics(self):
+        """Registra no log as latências por fase e a calibração, e exporta o resumo da partida."""
+        state = self.calibrator.state(self.match_threshold)
+        self.log(f"Limiar calibrado: {state['threshold']:.3f} ({state['pairs']} pares, "
+                 f"{state['non_pairs']} não-pares, {state['recaptures']} recapturas)")
+        for name, values in self.metrics.summary().items():
+            self.log(f"{name}: {values['count']}x p50={values['p50_ms']:.1f}ms "
+                     f"p95={values['p95_ms']:.1f}ms p99={values['p99_ms']:.1f}ms")
+        
+        write_errors, last_error = self.image_writer.take_errors()
+        if write_errors:
+            self.log(f"Erro ao gravar {write_errors} capturas de cartas (último: {last_error})")
+        
+        if self.metrics_format is None:
+            return
+        try:
+            os.makedirs(self.metrics_directory, exist_ok=True)
+            path = os.path.join(self.metrics_directory, f"game_{time.strftime('%Y%m%d_%H%M%S')}.{self.metrics_format}")
+            self.metrics.export(path)
+            self.log(f"Métricas exportadas para {path}")
+        except OSError as e:
+            self.log(f"Erro ao exportar métricas: {e}")
+    
+    def play_scheduled(self):
+        """Joga a partida pedindo a próxima carta ao escalonador; retorna False se ela for abortada."""
+        card_count = len(self.grid_positions)
+        knowledge = self.board_state
+        
+        expected = self.scheduler.expected_moves(card_count)
+        self.log(f"Estratégia {self.scheduler.name}: {expected:.1f} jogadas esperadas")
+        
+        self.move_count = 0
+        max_moves = self.max_moves_per_card * card_count
+        start_time = time.perf_counter()
+        if self.track_changes:
+            self.board_capture.reset_cells()
+        
+        while self.running:
+            if knowledge.finished():
+                # A crença do bot não basta: a partida só termina quando a tela confirma
+                if self.confirm_finished(knowledge):
+                    break
+                continue
+            if self.move_count >= max_moves:
+                self.log(f"Partida abortada: {self.move_count} jogadas sem terminar (limite de {max_moves})")
+                return False
+            
+            # Todas as cartas já vistas e nenhum par conhecido: reverificar antes de clicar às cegas
+            if knowledge.next_unseen() is None and knowledge.known_pair() is None:
+                self.reverify_pairs()
+            
+            # Todos os pares restantes já conhecidos: jogá-los em sequência
+            if self.fast_path and knowledge.all_pairs_known():
+                self.match_known_pairs(knowledge.known_pairs())
+                if self.track_changes:
+                    self.board_capture.reset_cells()
+                continue
+            
+            pair = self.scheduled_known_pair(knowledge)
+            if pair is not None:
+                # Par já conhecido: os dois cliques em sequência, sem esperar entre eles
+                first_card_pos, second_card_pos = pair
+                self.log(f"Clicando no par conhecido: {first_card_pos} e {second_card_pos}")
+                revealed = self.flip_pair(first_card_pos, second_card_pos)
+            else:
+                # Primeira carta da jogada
+                first_card_pos = self.scheduler.first_flip(knowledge)
+                self.log(f"Clicando na primeira carta da jogada: {first_card_pos}")
+                frame = self.flip_card(first_card_pos)
+                self.remember_card(knowledge, first_card_pos, frame)
+                
+                # Segunda carta da jogada
+                second_card_pos = self.scheduler.second_flip(knowledge, first_card_pos)
+                if second_card_pos is None:
+                    break
+                self.log(f"Clicando na segunda carta da jogada: {second_card_pos}")
+                revealed = self.flip_card(second_card_pos)
+                self.remember_card(knowledge, second_card_pos, revealed, exclude=(first_card_pos,))
+            self.move_count += 1
+            knowledge.record_attempt(first_card_pos, second_card_pos)
+            
+            # Uma carta cuja captura foi descartada (ainda virada para baixo) não é comparada
+            captured = knowledge.seen[first_card_pos] and knowledge.seen[second_card_pos]
+            matched = captured and self.is_same_card(first_card_pos, second_card_pos)
+            if matched:
+                self.log(f"Par encontrado: cartas {first_card_pos} e {second_card_pos}")
+                knowledge.record_match(first_card_pos, second_card_pos)
+            elif knowledge.partner(first_card_pos) == second_card_pos:
+                knowledge.forget_match(first_card_pos, second_card_pos)
+            
+            # Aguardar o par sair (ou desvirar) antes da próxima jogada
+            frame = self.wait_for_pair(first_card_pos, second_card_pos, revealed)
+            
+            if self.track_changes and frame is not None:
+                self.review_changed_cells(knowledge, first_card_pos, second_card_pos, matched, frame)
+            
+            if not captured:
+                continue
+            
+            # Alimentar a calibração só com resultados vistos na tela: par removido ou cartas desviradas
+            similarity = float(self.card_features.feature(first_card_pos) @ self.card_features.feature(second_card_pos))
+            accepted = bool(knowledge.matched[first_card_pos])
+            states = self.pair_states(first_card_pos, second_card_pos, frame) if frame is not None else None
+            if states in (("gone", "gone"), ("down", "down")):
+                self.calibrator.record(similarity, states == ("gone", "gone"))
+            self.record_move(first_card_pos, second_card_pos, similarity, accepted)
+        
+        elapsed = time.perf_counter() - start_time
+        self.log(f"Partida concluída em {self.move_count} jogadas ({expected:.1f} esperadas) e {elapsed:.1f}s")
+        return knowledge.finished()
+    
+    def confirm_finished(self, knowledge):
+        """Confere na tela que nenhuma carta dada como combinada está virada para baixo; desfaz os pares que estiverem."""
+        frame = self.board_capture.grab()
+        confirmed = True
+        for pos in np.flatnonzero(knowledge.matched):
+            pos = int(pos)
+            if knowledge.matched[pos] and self.is_face_down(pos, frame):
+                other = knowledge.partner(pos)
+                # Sem lista negra: o jogo pode só ter ignorado os cliques do par
+                self.log(f"O par {pos} e {other} continua no tabuleiro; voltando a jogar")
+                knowledge.matched[pos] = False
+                if other is not None:
+                    knowledge.forget_match(pos, other)
+                confirmed = False
+        return confirmed
+    
+    def record_move(self, pos1, pos2, similarity, accepted):
+        if self.recorder is not None:
+            self.recorder.write("move", {"pos1": pos1, "pos2": pos2, "similarity": similarity, "matched": accepted})
+    
+    def record_legacy_move(self, pos1, pos2, accepted):
+        """Registra uma jogada das fases; jogadas com carta não capturada não são gravadas."""
+        rows = self.card_features.rows
+        if pos1 in rows and pos2 in rows:
+            self.record_move(pos1, pos2, float(self.card_features.feature(pos1) @ self.card_features.feature(pos2)), accepted)
+    
+    def pair_removed(self, pos1, pos2, frame, expected):
+        """True se nenhuma das cartas voltou a ficar virada para baixo em frame (sem referência, vale expected)."""
+        if self.face_down_cells is None or frame is None:
+            return expected
+        return not any(self.is_face_down(pos, frame) for pos in (pos1, pos2))
+    
+    def match_known_pairs(self, pairs):
+        """Combina pares já conhecidos em sequência, conferindo o tabuleiro uma vez por rodada; retorna os pares confirmados."""
+        state = self.board_state
+        capture = self.board_capture
+        if self.face_down_cells is None:
+            self.face_down_cells = capture.cell_signatures()
+        interval = max(self.min_input_interval, self.learned_input_interval)
+        confirmed = 0
+        
+        def settle(candidates, frame):
+            """Confirma os pares removidos, completa os que ficaram com uma carta virada e devolve os que o jogo ignorou."""
+            nonlocal confirmed
+            ignored = []
+            for pos1, pos2 in candidates:
+                states = self.pair_states(pos1, pos2, frame)
+                if "up" in states and "down" in states:
+                    # Só um dos cliques foi aceito: clicar na carta que falta
+                    missing = pos1 if states[0] == "down" else pos2
+                    self.log(f"Só uma carta do par {pos1} e {pos2} virou; clicando na carta {missing}")
+                    frame = self.wait_for_pair(pos1, pos2, self.flip_card(missing))
+                    states = self.pair_states(pos1, pos2, frame)
+                elif states == ("up", "up"):
+                    # O par ainda está sendo mostrado
+                    frame = self.wait_for_pair(pos1, pos2, frame)
+                    states = self.pair_states(pos1, pos2, frame)
+                
+                if states == ("gone", "gone"):
+                    self.move_count += 1
+                    state.record_match(pos1, pos2)
+                    similarity = float(self.card_features.feature(pos1) @ self.card_features.feature(pos2))
+                    self.calibrator.record(similarity, True)
+                    self.record_move(pos1, pos2, similarity, True)
+                    confirmed += 1
+                elif states == ("down", "down"):
+                    ignored.append((pos1, pos2))
+                else:
+                    # Uma carta saiu sem a outra: o par conhecido está errado
+                    self.log(f"O par {pos1} e {pos2} não confere com a tela {states}; esquecendo o par")
+                    state.forget_match(pos1, pos2)
+                    self.rejected_pairs.add(frozenset((pos1, pos2)))
+                    for pos, card_state in zip((pos1, pos2), states):
+                        if card_state == "gone":
+                            state.matched[pos] = True
+            return ignored
+        
+        # Pares que já saíram do tabuleiro são só registrados
+        frame = capture.grab()
+        pending = [pair for pair in pairs if self.pair_states(*pair, frame) == ("down", "down")]
+        settle([pair for pair in pairs if pair not in pending], frame)
+        
+        while pending and self.running:
+            self.log(f"Combinando {len(pending)} pares conhecidos em sequência (intervalo de {interval * 1000:.0f}ms)")
+            
+            with self.metrics.span("fast_path"):
+                last_click = 0.0
+                for pos1, pos2 in pending:
+                    if not self.running:
+                        break
+                    for position in (pos1, pos2):
+                        self.pace_input(last_click + interval)
+                        self.click_card(position)
+                        last_click = time.perf_counter()
+                self.move_mouse_away()
+                
+                # Uma única espera: até as cartas ainda mostradas saírem (ou desvirarem)
+                frame = capture.grab()
+                showing = [pos for pair in pending for pos in pair if self.shows_card(pos, frame)]
+                if showing:
+                    frame = self.wait_for_settle(self.cell_references(showing, frame), positions=showing)
+            
+            pending = settle(pending, frame)
+            if not pending or interval >= self.action_delay:
+                break
+            self.log(f"{len(pending)} pares com cliques ignorados pelo jogo; repetindo mais devagar", logging.DEBUG)
+            interval = min(max(interval * 2, 0.05), self.action_delay)
+            self.learned_input_interval = interval
+        
+        # O jogo não aceitou os cliques nem no intervalo máximo: um par por vez, com a espera completa
+        for pos1, pos2 in pending:
+            if not self.running:
+                break
+            self.log(f"Combinando o par {pos1} e {pos2} separadamente")
+            revealed = self.flip_pair(pos1, pos2)
+            flipped = self.pair_states(pos1, pos2, revealed) == ("up", "up")
+            if settle([(pos1, pos2)], self.wait_for_pair(pos1, pos2, revealed)):
+                self.move_count += 1
+                if flipped:
+                    # As duas cartas foram mostradas e desviradas: o par em si está errado
+                    self.log(f"Par {pos1} e {pos2} recusado pelo jogo; esquecendo o par")
+                    state.forget_match(pos1, pos2)
+                    self.rejected_pairs.add(frozenset((pos1, pos2)))
+        return confirmed
+    
+    def card_state(self, position, frame):
+        """Estado da carta no frame: "down" (virada para baixo), "up" (mostrando a face) ou "gone" (removida)."""
+        if self.is_face_down(position, frame):
+            return "down"
+        return "up" if self.shows_card(position, frame) else "gone"
+    
+    def pair_states(self, pos1, pos2, frame):
+        return (self.card_state(pos1, frame), self.card_state(pos2, frame))
+    
+    def pace_input(self, deadline):
+        """Espera até deadline lendo a tela, em vez de dormir, para acompanhar a animação do jogo."""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            self.board_capture.grab()
+            if self.settle_poll_interval:
+                time.sleep(min(self.settle_poll_interval, remaining))
+    
+    def shows_card(self, position, frame):
+        """True se a carta está virada para cima no frame (parecida com a sua captura)."""
+        feature = self.card_features.extract(self.board_capture.card_view(position, frame))
+        return float(feature @ self.card_features.feature(position)) > self.similarity_threshold()
+    
+    def scheduled_known_pair(self, knowledge):
+        """Retorna o par conhecido que o escalonador jogaria agora, se as duas cartas já foram vistas."""
+        if not self.batch_pair_clicks:
+            return None
+        pair = knowledge.known_pair()
+        if pair is None or not knowledge.seen[pair[0]] or not knowledge.seen[pair[1]]:
+            return None
+        if self.scheduler.first_flip(knowledge) != pair[0] or self.scheduler.second_flip(knowledge, pair[0]) != pair[1]:
+            return None
+        return pair
+    
+    def review_changed_cells(self, knowledge, pos1, pos2, matched, frame):
+        """Confere na tela, sem cliques extras, o que o jogo fez com as cartas após a jogada."""
+        with self.metrics.span("review"):
+            changed = set(self.board_capture.dirty_cells(frame))
+            
+            if not matched and pos1 in changed and pos2 in changed:
+                # Mudar não basta (ruído): as cartas só foram removidas se não estão viradas para baixo nem mostram a face
+                if self.pair_states(pos1, pos2, frame) == ("gone", "gone"):
+                    self.log(f"Cartas {pos1} e {pos2} removidas pelo jogo: registrando o par")
+                    knowledge.record_match(pos1, pos2)
+                    self.board_capture.accept_cells((pos1, pos2))
+            elif matched:
+                self.pending_removals.update((pos1, pos2))
+            
+            # Pares aceitos: confirmar quando somem, ou desfazer se voltaram a ficar virados para baixo
+            for pos in list(self.pending_removals):
+                if pos not in self.pending_removals:
+                    continue
+                state = self.card_state(pos, frame) if knowledge.matched[pos] else None
+                if state == "down":
+                    other = knowledge.partner(pos)
+                    self.log(f"O jogo não aceitou o par {pos} e {other}: cartas viradas para baixo novamente")
+                    knowledge.matched[pos] = False
+                    if other is not None:
+                        knowledge.forget_match(pos, other)
+                        self.rejected_pairs.add(frozenset((pos, other)))
+                    self.pending_removals.discard(other)
+                elif state == "gone":
+                    self.board_capture.accept_cells((pos,))
+                elif state == "up":
+                    continue
+                self.pending_removals.discard(pos)
+            
+            unexpected = {pos for pos in changed if not knowledge.matched[pos]} - {pos1, pos2}
+            if unexpected:
+                self.log(f"Cartas alteradas fora da jogada: {sorted(unexpected)}", logging.DEBUG)
+    
+    def remember_card(self, knowledge, position, frame, exclude=()):
+        """Captura a carta revelada (de novo a cada revelação) e registra um par conhecido para ela."""
+        if self.is_face_down(position, frame):
+            self.log(f"A carta {position} continua virada para baixo; captura descartada")
+            return
+        
+        knowledge.reveal(position)
+        image = self.capture_card_image(position, frame)
+        self.store_card(position, image)
+        
+        if knowledge.pair[position] < 0:
+            match_pos = self.find_matching_card(position, exclude, recapture=True)
+            if match_pos is not None:
+                self.log(f"Identificado par para a carta {position}: carta {match_pos}")
+                knowledge.record_pair(position, match_pos)
+    
+    def similarity_threshold(self):
+        """Limiar atual: o limiar base ajustado pela calibração da partida."""
+        return self.calibrator.threshold(self.match_threshold)
+    
+    def card_similarity(self, pos1, pos2):
+        with self.metrics.span("compare"):
+            similarity = float(self.card_features.feature(pos1) @ self.card_features.feature(pos2))
+        self.comparison_count += 1
+        self.log(f"similarity na carta {pos1} - {pos2} :({similarity})", logging.DEBUG)
+        return similarity
+    
+    def is_same_card(self, pos1, pos2):
+        """Verifica se duas cartas já capturadas formam um par."""
+        if frozenset((pos1, pos2)) in self.rejected_pairs:
+            return False
+        if self.board_state.partner(pos1) == pos2:
+            return True
+        return self.card_similarity(pos1, pos2) > self.similarity_threshold()
     
     def discover_all_cards(self):
         """Revela e memoriza todas as cartas do jogo"""
         self.log("Fase 1: Descobrindo todas as cartas")
         
-        # Lista de posições que ainda não foram verificadas
-        positions_to_check = list(range(16))
+        # Posições que ainda não foram verificadas, em ordem
+        state = self.board_state
+        positions_to_check = iter(range(len(self.grid_positions)))
         
-        while self.running and positions_to_check:
-            # Selecionar a primeira carta da rodada
-            first_card_pos = positions_to_check.pop(0)
+        for first_card_pos in positions_to_check:
+            if not self.running:
+                break
             
             # Pular se a carta já foi combinada
-            if first_card_pos in self.matched_cards:
+            if state.matched[first_card_pos]:
                 continue
                 
             self.log(f"Clicando na primeira carta da rodada: {first_card_pos}")
-            self.click_card(first_card_pos)
-            time.sleep(self.action_delay)
-            
-            # Capturar a imagem da primeira carta
-            first_card_image = self.capture_card_image(first_card_pos)
-            self.card_images[first_card_pos] = first_card_image
-            
-            # Verificar se já existe um par para esta carta
-            found_match = False
-            match_pos = None
-            
-            for pos, img in self.card_images.items():
-                if pos != first_card_pos and pos not in self.matched_cards:
-                    if self.compare_images(first_card_image, img, first_card_pos, pos):
-                        found_match = True
-                        match_pos = pos
-                        
-                        # Registrar o par identificado
-                        if first_card_pos not in self.card_pairs:
-                            self.card_pairs[first_card_pos] = match_pos
-                        if match_pos not in self.card_pairs:
-                            self.card_pairs[match_pos] = first_card_pos
-                            
-                        self.log(f"Identificado par para a carta {first_card_pos}: carta {match_pos}")
-                        break
+            frame = self.flip_card(first_card_pos)
+            
+            # Selecionar a segunda carta da rodada, pulando as já combinadas
+            second_card_pos = next((pos for pos in positions_to_check if not state.matched[pos]), None)
+            if second_card_pos is not None:
+                self.log(f"Clicando na segunda carta da rodada: {second_card_pos}")
+                frame = self.flip_card(second_card_pos)
             
-            # Selecionar a segunda carta da rodada
-            if len(positions_to_check) > 0:
-                second_card_pos = positions_to_check.pop(0)
+            # O frame estável após o último clique serve para as duas cartas viradas;
+            # uma carta que ainda parece virada para baixo não é capturada
+            round_cards = [pos for pos in (first_card_pos, second_card_pos)
+                           if pos is not None and not self.is_face_down(pos, frame)]
+            for pos in {first_card_pos, second_card_pos} - set(round_cards) - {None}:
+                self.log(f"A carta {pos} continua virada para baixo; captura descartada")
+            
+            for pos in round_cards:
+                self.store_card(pos, self.capture_card_image(pos, frame))
+            
+            if first_card_pos in round_cards:
+                # Verificar se já existe um par para esta carta
+                match_pos = self.find_matching_card(first_card_pos)
                 
-                # Pular se a carta já foi combinada
-                while second_card_pos in self.matched_cards and positions_to_check:
-                    second_card_pos = positions_to_check.pop(0)
+                if match_pos is not None:
+                    # Registrar o par identificado
+                    if state.pair[first_card_pos] < 0:
+                        state.pair[first_card_pos] = match_pos
+                    if state.pair[match_pos] < 0:
+                        state.pair[match_pos] = first_card_pos
+                        
+                    self.log(f"Identificado par para a carta {first_card_pos}: carta {match_pos}")
+            
+            matched = False
+            if len(round_cards) == 2:
+                # Verificar se formam um par
+                with self.metrics.span("compare"):
+                    first_feature = self.card_features.feature(first_card_pos)
+                    similarity = float(first_feature @ self.card_features.feature(second_card_pos))
+                self.comparison_count += 1
+                self.log(f"similarity na carta {first_card_pos} - {second_card_pos} :({similarity})", logging.DEBUG)
                 
-                if second_card_pos not in self.matched_cards:
-                    self.log(f"Clicando na segunda carta da rodada: {second_card_pos}")
-                    self.click_card(second_card_pos)
-                    time.sleep(self.action_delay)
+                matched = similarity > self.similarity_threshold()
+                if matched:
+                    self.log(f"Par encontrado: cartas {first_card_pos} e {second_card_pos}")
                     
-                    # Capturar a imagem da segunda carta
-                    second_card_image = self.capture_card_image(second_card_pos)
-                    self.card_images[second_card_pos] = second_card_image
-                    
-                    # Verificar se formam um par
-                    if self.compare_images(first_card_image, second_card_image, first_card_pos, second_card_pos):
-                        self.log(f"Par encontrado: cartas {first_card_pos} e {second_card_pos}")
+                    # Registrar o par e marcar ambas as cartas como combinadas
+                    # (para não clicar nelas novamente durante a descoberta)
+                    state.record_match(first_card_pos, second_card_pos)
+                else:
+                    # Verificar se a segunda carta forma par com alguma carta já conhecida
+                    pos = self.find_matching_card(second_card_pos, exclude=(first_card_pos,))
+                    if pos is not None:
+                        self.log(f"Identificado par para a carta {second_card_pos}: carta {pos}")
                         
                         # Registrar o par identificado
-                        self.card_pairs[first_card_pos] = second_card_pos
-                        self.card_pairs[second_card_pos] = first_card_pos
-                        
-                        # Marcar ambas as cartas como combinadas (para não clicar nelas novamente durante a descoberta)
-                        self.matched_cards.add(first_card_pos)
-                        self.matched_cards.add(second_card_pos)
-                    else:
-                        # Verificar se a segunda carta forma par com alguma carta já conhecida
-                        for pos, img in self.card_images.items():
-                            if pos != second_card_pos and pos not in self.matched_cards:
-                                if self.compare_images(second_card_image, img, second_card_pos, pos):
-                                    self.log(f"Identificado par para a carta {second_card_pos}: carta {pos}")
-                                    
-                                    # Registrar o par identificado
-                                    self.card_pairs[second_card_pos] = pos
-                                    self.card_pairs[pos] = second_card_pos
-                                    break
-            
-            # Aguardar antes da próxima rodada
-            time.sleep(self.action_delay)
-        
-        # Limpar o conjunto de cartas combinadas para a próxima fase
-        self.matched_cards = set()
+                        state.record_pair(second_card_pos, pos)
+            
+            # Aguardar as cartas desvirarem (ou o par sumir) antes da próxima rodada
+            if second_card_pos is not None:
+                settled = self.wait_for_pair(first_card_pos, second_card_pos, frame)
+                self.move_count += 1
+                if len(round_cards) == 2:
+                    # O resultado gravado é o do jogo, conferido na tela
+                    accepted = self.pair_removed(first_card_pos, second_card_pos, settled, matched)
+                    if accepted and not matched:
+                        self.log(f"Par encontrado pelo jogo: cartas {first_card_pos} e {second_card_pos}")
+                        state.record_match(first_card_pos, second_card_pos)
+                    elif matched and not accepted:
+                        state.forget_match(first_card_pos, second_card_pos)
+                    self.record_legacy_move(first_card_pos, second_card_pos, accepted)
+        
+        # Limpar as cartas combinadas para a próxima fase
+        state.matched[:] = False
         self.log("Fase de descoberta concluída")
     
     def match_all_pairs(self):
         """Combina todos os pares de cartas identificados"""
         self.log("Fase 2: Combinando todos os pares")
         
-        # Lista de cartas ainda não combinadas
-        cards_to_match = [i for i in range(16) if i not in self.matched_cards]
+        # Confirmar os pares com todas as cartas capturadas antes de começar
+        self.reverify_pairs()
         
-        while self.running and len(self.matched_cards) < 16:
-            # Selecionar uma carta que ainda não foi combinada
-            if not cards_to_match:
-                self.log("Todas as cartas foram combinadas!")
+        # Pares conhecidos: todos em sequência, com confirmação pela tela
+        if self.fast_path:
+            self.match_known_pairs(self.board_state.known_pairs())
+        
+        # Percorrer as cartas em ordem; as já combinadas são puladas
+        state = self.board_state
+        card_count = len(self.grid_positions)
+        
+        for card1 in range(card_count):
+            if not self.running or state.matched.all():
                 break
-                
-            card1 = cards_to_match.pop(0)
             
             # Pular se a carta já foi combinada
-            if card1 in self.matched_cards:
+            if state.matched[card1]:
                 continue
             
             # Verificar se temos um par conhecido para esta carta
-            if card1 in self.card_pairs:
-                card2 = self.card_pairs[card1]
-                
+            card2 = state.partner(card1)
+            if card2 is not None:
                 # Verificar se o par ainda não foi combinado
-                if card2 not in self.matched_cards:
+                if not state.matched[card2]:
                     self.log(f"Combinando o par de cartas {card1} e {card2}")
                     
                     # Clicar na primeira carta
-                    self.click_card(card1)
-                    time.sleep(self.action_delay)
+                    self.flip_card(card1)
                     
                     # Clicar na segunda carta
-                    self.click_card(card2)
-                    time.sleep(self.action_delay)
+                    pair_frame = self.flip_card(card2)
+                    self.move_count += 1
                     
                     # Marcar ambas as cartas como combinadas
-                    self.matched_cards.add(card1)
-                    self.matched_cards.add(card2)
+                    state.matched[[card1, card2]] = True
                     
-                    # Remover a segunda carta da lista de pendentes, se estiver lá
-                    if card2 in cards_to_match:
-                        cards_to_match.remove(card2)
-                    
-                    # Aguardar antes da próxima combinação
-                    time.sleep(self.action_delay)
+                    # Aguardar o par sair do tabuleiro antes da próxima combinação
+                    settled = self.wait_for_pair(card1, card2, pair_frame)
+                    self.record_legacy_move(card1, card2, self.pair_removed(card1, card2, settled, True))
             else:
                 # Se não conhecemos o par, tentar descobrir
                 self.log(f"Não foi encontrado par para a carta {card1}, tentando descobrir...")
                 
-                # Clicar na primeira carta
-                self.click_card(card1)
-                time.sleep(self.action_delay)
-                
-                # Tentar as cartas restantes uma a uma
-                for card2 in cards_to_match:
-                    if card2 != card1 and card2 not in self.matched_cards:
-                        # Clicar na carta candidata
-                        self.click_card(card2)
-                        time.sleep(self.action_delay)
-                        
-                        # Se formarem um par, elas serão automaticamente combinadas
-                        # Atualizar o estado
-                        self.matched_cards.add(card1)
-                        self.matched_cards.add(card2)
-                        if card2 in cards_to_match:
-                            cards_to_match.remove(card2)
-                        
+                # Tentar as cartas restantes uma a uma, até o jogo aceitar o par
+                for card2 in range(card1 + 1, card_count):
+                    if not self.running:
+                        break
+                    if state.matched[card2]:
+                        continue
+                    
+                    # Clicar na primeira carta e na candidata
+                    last_frame = self.flip_pair(card1, card2)
+                    self.move_count += 1
+                    
+                    # Aguardar o par sair (ou desvirar) antes da próxima tentativa
+                    settled = self.wait_for_pair(card1, card2, last_frame)
+                    matched = self.pair_removed(card1, card2, settled, True)
+                    self.record_legacy_move(card1, card2, matched)
+                    if matched:
+                        state.matched[[card1, card2]] = True
                         self.log(f"Par encontrado: cartas {card1} e {card2}")
                         break
-                        
-                # Aguardar antes da próxima tentativa
-                time.sleep(self.action_delay)
         
+        if state.matched.all():
+            self.log("Todas as cartas foram combinadas!")
         self.log("Fase de combinação concluída")
 
+class MultiBoardRunner:
+    """Joga em vários tabuleiros ao mesmo tempo, com um bot (e uma thread) por tabuleiro."""
+    def __init__(self, boards, backend, log_sink=None, persist_mode=None, scheduler_class=GreedyScheduler):
+        """boards é uma lista de (card_area, linhas, colunas)."""
+        self.shared_capture = SharedScreenCapture(backend, [board[0] for board in boards])
+        self.input_scheduler = InputScheduler(backend)
+        self.bots = []
+        self.threads = []
+        
+        for index, (card_area, rows, cols) in enumerate(boards):
+            bot = MemoryGameBot(None, backend=BoardBackend(self.shared_capture, self.input_scheduler), persist_mode=None)
+            if log_sink is not None:
+                bot.log_sink = log_sink
+            bot.log_prefix = f"[Tabuleiro {index}] "
+            bot.scheduler = scheduler_class() if scheduler_class else None
+            if persist_mode is not None:
+                bot.image_writer = CardImageWriter(f"./capturedCards/board_{index}", mode=persist_mode)
+                bot.metrics_format = "json"
+                bot.metrics_directory = f"./metrics/board_{index}"
+            bot.grid_rows, bot.grid_cols = rows, cols
+            bot.card_area = card_area
+            bot.create_card_grid()
+            self.bots.append(bot)
+    
+    def start(self):
+        self.threads = []
+        for bot in self.bots:
+            bot.reset_game()
+            bot.running = True
+            thread = threading.Thread(target=bot.run_bot)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+    
+    def stop(self):
+        for bot in self.bots:
+            bot.running = False
+    
+    def running(self):
+        return any(thread.is_alive() for thread in self.threads)
+    
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+    
+    def close(self):
+        """Para os bots e grava as capturas que ainda estão na fila."""
+        self.stop()
+        for bot in self.bots:
+            bot.image_writer.close()
+
+def run_multi_board_benchmark(games=20, boards=4, rows=4, cols=4, seed=0):
+    """Joga partidas simuladas em vários tabuleiros ao mesmo tempo, com captura compartilhada."""
+    moves = []
+    grabs = []
+    failures = 0
+    start = time.perf_counter()
+    
+    for game in range(games):
+        # Tabuleiros lado a lado na mesma "tela". Cada captura da tela avança o relógio de
+        # todos os tabuleiros, então a animação simulada dura proporcionalmente mais capturas.
+        width = cols * 64 + 20
+        simulated = [
+            SimulatedBoard(rows, cols, origin=(10 + index * width, 10), seed=seed + game * boards + index, hide_after=25 * boards)
+            for index in range(boards)
+        ]
+        desktop = SimulatedDesktop(simulated)
+        runner = MultiBoardRunner([(board.board_area, rows, cols) for board in simulated], desktop)
+        for bot in runner.bots:
+            bot.board_capture.poll_interval = 0
+            bot.min_input_interval = 0
+        
+        runner.start()
+        runner.join()
+        
+        failures += sum(not board.finished() for board in simulated)
+        moves.extend(board.moves for board in simulated)
+        grabs.append(runner.shared_capture.grab_count)
+    
+    elapsed = time.perf_counter() - start
+    print(f"{games} rodadas com {boards} tabuleiros {rows}x{cols}, {failures} partidas não concluídas")
+    print(f"  jogadas por partida: {percentile_summary(moves)}")
+    print(f"  capturas da tela por rodada: {percentile_summary(grabs)}")
+    print(f"  partidas por segundo: {games * boards / elapsed:.1f}")
+
+def run_continuous_benchmark(games=20, rows=4, cols=4, seed=0):
+    """Joga várias partidas seguidas no mesmo tabuleiro simulado, no modo contínuo do bot."""
+    board = SimulatedBoard(rows, cols, seed=seed, restart_after=10)
+    bot = MemoryGameBot(None, backend=board, persist_mode=None)
+    bot.settle_poll_interval = 0
+    bot.min_input_interval = 0
+    bot.grid_rows, bot.grid_cols = rows, cols
+    bot.card_area = board.board_area
+    bot.create_card_grid()
+    bot.continuous = True
+    bot.max_games = games
+    
+    moves = []
+    play_game = bot.play_game
+    def play_and_count():
+        completed = play_game()
+        moves.append(bot.move_count)
+        return completed
+    bot.play_game = play_and_count
+    
+    bot.reset_game()
+    bot.running = True
+    start = time.perf_counter()
+    bot.run_bot()
+    elapsed = time.perf_counter() - start
+    
+    print(f"{bot.games_played} de {games} partidas {rows}x{cols} seguidas no modo contínuo ({board.games} tabuleiros distribuídos)")
+    print(f"  jogadas por partida: {percentile_summary(moves)}")
+    print(f"  partidas por hora: {bot.games_played / elapsed * 3600:.0f}")
+
+def percentile_summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    return f"média={values.mean():.3f} p50={np.percentile(values, 50):.3f} p95={np.percentile(values, 95):.3f}"
+
+def run_benchmark(games=1000, rows=4, cols=4, scheduler="gulosa", seed=0, noise=0, references=False, record_directory=None,
+                  input_lock=True, library_directory=None):
+    """Joga várias partidas no SimulatedBoard, sem display, e imprime as métricas por partida."""
+    schedulers = {"gulosa": GreedyScheduler, "sequencial": SequentialScheduler, "fases": None}
+    scheduler_class = schedulers[scheduler]
+    
+    metrics = {"jogadas": [], "cliques": [], "comparações": [], "capturas": [], "tempo de captura (ms)": [], "tempo total (ms)": [],
+               "limiar calibrado": [], "recapturas": [], "movimentos do mouse": [], "cliques ignorados": []}
+    if library_directory is not None:
+        metrics["faces na biblioteca"] = []
+    failures = 0
+    phase_metrics = PhaseMetrics()
+    
+    # O intervalo entre cliques aprendido passa de uma partida para a outra, como no bot real
+    learned_input_interval = 0.0
+    
+    for game in range(games):
+        board = SimulatedBoard(rows, cols, seed=seed + game, noise=noise, input_lock=input_lock,
+                               face_seed=seed if library_directory is not None else None)
+        bot = MemoryGameBot(None, backend=board, persist_mode=None)
+        if library_directory is not None:
+            bot.card_library = CardFaceLibrary(bot.card_features, library_directory)
+        bot.scheduler = scheduler_class() if scheduler_class else None
+        bot.settle_poll_interval = 0
+        bot.min_input_interval = 0  # o simulador aceita cliques em qualquer ritmo
+        bot.learned_input_interval = learned_input_interval
+        bot.grid_rows, bot.grid_cols = rows, cols
+        bot.card_area = board.board_area
+        bot.create_card_grid()
+        if references:
+            bot.reward_rows, bot.reward_cols = board.reward_rows, board.reward_cols
+            bot.reward_area = board.reward_area
+            bot.create_reward_positions()
+        
+        bot.reset_game()
+        bot.metrics = phase_metrics  # acumula as latências de todas as partidas
+        bot.record_directory = record_directory
+        bot.running = True
+        start = time.perf_counter()
+        bot.run_bot()
+        elapsed = time.perf_counter() - start
+        learned_input_interval = bot.learned_input_interval
+        
+        if not board.finished():
+            failures += 1
+        metrics["jogadas"].append(board.moves)
+        metrics["cliques"].append(bot.click_count)
+        metrics["comparações"].append(bot.comparison_count)
+        metrics["capturas"].append(bot.board_capture.grab_count)
+        metrics["tempo de captura (ms)"].append(bot.board_capture.grab_time * 1000)
+        metrics["tempo total (ms)"].append(elapsed * 1000)
+        calibration = bot.calibrator.state(bot.match_threshold)
+        metrics["limiar calibrado"].append(calibration["threshold"])
+        metrics["recapturas"].append(calibration["recaptures"])
+        metrics["movimentos do mouse"].append(bot.input.parks)
+        metrics["cliques ignorados"].append(board.dropped_clicks)
+        if library_directory is not None:
+            metrics["faces na biblioteca"].append(len(bot.card_library))
+    
+    print(f"{games} partidas {rows}x{cols}, estratégia {scheduler}, {failures} não concluídas")
+    for name, values in metrics.items():
+        print(f"  {name}: {percentile_summary(values)}")
+    print("  latência por fase (ms):")
+    for name, values in phase_metrics.summary().items():
+        print(f"    {name}: p50={values['p50_ms']:.3f} p95={values['p95_ms']:.3f} p99={values['p99_ms']:.3f}")
+    return metrics
+
+def run_capture_benchmark(seconds=2.0, region=(0, 0, 800, 600), capture_file=None):
+    """Compara os grabbers disponíveis: capturas por segundo e bytes copiados por captura."""
+    grabbers = []
+    for name in CAPTURE_BACKENDS:
+        try:
+            grabber = open_grabber(name)
+            grabber.grab(region)
+        except Exception as e:
+            print(f"{name}: indisponível ({e})")
+            continue
+        grabbers.append(grabber)
+    if capture_file:
+        grabbers.append(ArrayGrabber.from_file(capture_file))
+    else:
+        grabbers.append(ArrayGrabber(np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)))
+    
+    for grabber in grabbers:
+        for label, bbox in (("tela inteira", None), ("região", region)):
+            grabber.grab(bbox)  # cria os buffers antes de medir
+            grabs, copied = grabber.grabs, grabber.bytes_copied
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                frame = grabber.grab(bbox)
+            elapsed = time.perf_counter() - start
+            count = grabber.grabs - grabs
+            print(f"{grabber.name} ({label}, {frame.shape[1]}x{frame.shape[0]}): {count / elapsed:.1f} capturas/s, "
+                  f"{(grabber.bytes_copied - copied) / count / 1024:.0f} KiB copiados por captura")
+        grabber.close()
+
+def run_startup_benchmark(runs=5, target=1.0):
+    """Mede a abertura do programa em processos novos; retorna False se passar de target ou importar módulos pesados."""
+    times = []
+    heavy = set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), "--startup-probe"],
+                                capture_output=True, text=True, check=True)
+        times.append(time.perf_counter() - start)
+        heavy.update(json.loads(result.stdout.strip().splitlines()[-1]))
+    
+    median = float(np.median(times))
+    print(f"Inicialização em {runs} execuções: p50={median * 1000:.0f}ms máx={max(times) * 1000:.0f}ms (meta {target * 1000:.0f}ms)")
+    if heavy:
+        print(f"  módulos pesados importados na abertura: {', '.join(sorted(heavy))}")
+    ok = median <= target and not heavy
+    print("  OK" if ok else "  FALHOU")
+    return ok
+
+def startup_probe():
+    """Abre a interface (ou só o bot, sem display) e informa os módulos pesados já importados."""
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None
+    MemoryGameBot(root)
+    if root is not None:
+        root.update()
+        root.destroy()
+    print(json.dumps([name for name in HEAVY_MODULES if name in sys.modules]))
+
+def run_replay(paths, scheduler=None, profile=False):
+    """Joga de novo partidas gravadas, sem display e sem esperas, e compara com o original."""
+    schedulers = {"gulosa": GreedyScheduler, "sequencial": SequentialScheduler, "fases": None}
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    
+    for path in paths:
+        recording = read_recording(path)
+        if recording["header"] is None:
+            print(f"{path}: gravação sem cabeçalho")
+            continue
+        try:
+            board = ReplayBoard(recording)
+        except ValueError as e:
+            print(f"{path}: {e}")
+            continue
+        
+        header = recording["header"]
+        name = scheduler or header.get("scheduler", "gulosa")
+        bot = MemoryGameBot(None, backend=board, persist_mode=None)
+        bot.scheduler = schedulers[name]() if schedulers[name] else None
+        bot.settle_poll_interval = 0
+        bot.min_input_interval = 0  # o simulador aceita cliques em qualquer ritmo
+        bot.grid_rows, bot.grid_cols = header["rows"], header["cols"]
+        bot.match_threshold = header["threshold"]
+        bot.card_area = board.board_area
+        bot.create_card_grid()
+        bot.reset_game()
+        bot.running = True
+        
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        bot.run_bot()
+        if profiler is not None:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        
+        original = recording["summary"] or {}
+        recorded_time = recording["moves"][-1]["time"] if recording["moves"] else 0.0
+        print(f"{os.path.basename(path)}: {'concluída' if board.finished() else 'NÃO concluída'} (estratégia {name})")
+        print(f"  jogadas: {board.moves} (gravado: {original.get('moves', len(recording['moves']))})")
+        print(f"  comparações: {bot.comparison_count} (gravado: {original.get('comparisons', '?')})")
+        print(f"  tempo: {elapsed * 1000:.1f}ms (gravado: {recorded_time * 1000:.1f}ms)")
+    
+    if profiler is not None:
+        import pstats
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
 # Função principal
 def main():
+    parser = argparse.ArgumentParser(description="Bot Automático - Jogo da Memória")
+    parser.add_argument("--benchmark", action="store_true", help="roda partidas simuladas sem interface")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("--scheduler", choices=["gulosa", "sequencial", "fases"],
+                        help="estratégia de jogo (padrão: gulosa; no replay, a da gravação)")
+    parser.add_argument("--noise", type=int, default=0, help="ruído (0-255) adicionado às capturas simuladas")
+    parser.add_argument("--no-input-lock", action="store_true", help="o tabuleiro simulado aceita cliques durante a animação de um par")
+    parser.add_argument("--references", action="store_true", help="identifica as cartas pela área de referência simulada")
+    parser.add_argument("--library", metavar="DIR", help="reconhece as faces entre partidas com a biblioteca em DIR")
+    parser.add_argument("--boards", type=int, default=1, help="número de tabuleiros simulados jogando ao mesmo tempo")
+    parser.add_argument("--input-interval", type=float, default=0.05, help="intervalo mínimo entre cliques ao combinar pares já conhecidos (s)")
+    parser.add_argument("--input-pause", type=float, default=0.0, help="espera após cada clique (s), no lugar da pausa do pyautogui")
+    parser.add_argument("--no-park", action="store_true", help="não tira o mouse de cima do tabuleiro antes de ler a tela")
+    parser.add_argument("--continuous", action="store_true", help="joga partidas seguidas, detectando cada novo tabuleiro")
+    parser.add_argument("--record", metavar="DIR", help="grava cada partida em DIR para replay")
+    parser.add_argument("--replay", nargs="+", metavar="ARQUIVO", help="joga de novo partidas gravadas, sem display")
+    parser.add_argument("--profile", action="store_true", help="roda o replay sob o cProfile")
+    parser.add_argument("--capture", choices=["auto"] + list(CAPTURE_BACKENDS), default="auto", help="grabber usado para capturar a tela")
+    parser.add_argument("--capture-benchmark", type=float, metavar="SEGUNDOS", help="compara os grabbers disponíveis")
+    parser.add_argument("--capture-file", help="imagem usada como tela falsa no --capture-benchmark")
+    parser.add_argument("--config-profile", metavar="NOME", help="carrega um perfil salvo, sem selecionar as áreas")
+    parser.add_argument("--profiles-file", default="./profiles.json", help="arquivo dos perfis salvos")
+    parser.add_argument("--autostart", action="store_true", help="inicia o bot assim que o perfil for conferido com a tela")
+    parser.add_argument("--log-file", help="espelha o log em um arquivo com rotação")
+    parser.add_argument("--startup-benchmark", type=int, metavar="N", help="mede a inicialização em N processos novos")
+    parser.add_argument("--startup-target", type=float, default=1.0, help="tempo máximo de inicialização aceito (s)")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.startup_probe:
+        startup_probe()
+        return
+    if args.startup_benchmark:
+        if not run_startup_benchmark(args.startup_benchmark, args.startup_target):
+            sys.exit(1)
+        return
+    
+    if args.capture_benchmark:
+        run_capture_benchmark(args.capture_benchmark, capture_file=args.capture_file)
+        return
+    if args.replay:
+        run_replay(args.replay, args.scheduler, args.profile)
+        return
+    if args.benchmark and args.continuous:
+        run_continuous_benchmark(args.games, args.rows, args.cols)
+        return
+    if args.benchmark and args.boards > 1:
+        run_multi_board_benchmark(args.games, args.boards, args.rows, args.cols)
+        return
+    if args.benchmark:
+        run_benchmark(args.games, args.rows, args.cols, args.scheduler or "gulosa", noise=args.noise, references=args.references,
+                      record_directory=args.record, input_lock=not args.no_input_lock, library_directory=args.library)
+        return
+    
     root = tk.Tk()
-    app = MemoryGameBot(root)
+    app = MemoryGameBot(root, backend=DesktopBackend(args.capture), log_file=args.log_file)
+    app.continuous_var.set(args.continuous)
+    app.input.pause = args.input_pause
+    app.min_input_interval = args.input_interval
+    app.input.park_enabled = not args.no_park
+    app.record_directory = args.record
+    if args.library:
+        app.card_library = CardFaceLibrary(app.card_features, args.library)
+    app.profile_store = ProfileStore(args.profiles_file)
+    app.start_warm_up()
+    if args.config_profile:
+        app.profile_name_var.set(args.config_profile)
+        app.load_profile(args.config_profile, autostart=args.autostart)
     root.mainloop()
+    
+    # Parar os bots e gravar as capturas ainda na fila antes de sair
+    app.running = False
+    app.image_writer.close()
+    if app.runner is not None:
+        app.runner.close()
 
 if __name__ == "__main__":
     main()